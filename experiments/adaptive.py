@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+import math
+import os.path
+import statistics
+
+from experiments.results import read_result_row
+from experiments.runtime import invalid
+from experiments.workload import append_to_workload
+
+# Adaptive number of seeds: the seeds of experiment.json are the minimum
+# number of repetitions of each (algorithm, instance, threads, k, epsilon).
+# Once all runs of such a group are completed, another seed is added while the
+# 95% confidence interval of the metric is wider than the target (relative to
+# the mean), up to the maximum number of seeds:
+#
+#   "adaptive_seeds": {"metric": "km1", "relative_ci": 0.05, "max_seeds": 20}
+#
+# The added runs are appended to the workload files (the executed one,
+# workload.txt, workload.jsonl and the workload of the algorithm), so that an
+# interrupted execution resumes with them and setup_experiments.py --extend
+# knows them. Timeouts and failed runs do not provide a value.
+
+# two-sided 97.5% quantiles of the t distribution, by degrees of freedom
+_t_quantiles = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def relative_ci_width(values):
+  if len(values) < 2:
+    return math.inf
+  mean = statistics.mean(values)
+  stdev = statistics.stdev(values)
+  if stdev == 0:
+    return 0.0
+  if mean == 0:
+    return math.inf
+  t = _t_quantiles[len(values) - 2] if len(values) - 2 < len(_t_quantiles) else 1.96
+  return t * stdev / math.sqrt(len(values)) / abs(mean)
+
+
+def _group(run):
+  return (run.algorithm, run.instance, run.threads, run.k, run.epsilon, run.objective)
+
+
+class AdaptiveSeeds:
+  def __init__(self, settings, runs, workload_files, executor_columns=()) -> None:
+    self.metric = settings.get("metric", "km1")
+    self.relative_ci = settings.get("relative_ci", 0.05)
+    self.max_seeds = settings["max_seeds"]
+    self.workload_files = workload_files
+    self.executor_columns = executor_columns
+    # group -> [last run, seeds, number of unfinished runs, values]
+    self.groups = {}
+    for run in runs:
+      group = self.groups.setdefault(_group(run), [run, set(), 0, []])
+      if run.seed > group[0].seed:
+        group[0] = run
+      group[1].add(run.seed)
+      group[2] += 1
+
+  # Value of the metric reported by a completed run, None if it has none
+  def read_value(self, run):
+    row = read_result_row(run.result_file, self.executor_columns)
+    if row is None or row.get("timeout") == "yes" or row.get("failed") == "yes":
+      return None
+    try:
+      value = float(row[self.metric])
+    except (KeyError, ValueError):
+      return None
+    return value if value != invalid else None
+
+  # Records a run completed by an earlier execution
+  def record(self, run) -> None:
+    group = self.groups[_group(run)]
+    group[2] -= 1
+    value = self.read_value(run)
+    if value is not None:
+      group[3].append(value)
+
+  def _extend(self, group):
+    last_run, seeds, unfinished, values = group
+    if unfinished > 0 or len(seeds) >= self.max_seeds or relative_ci_width(values) <= self.relative_ci:
+      return []
+    new_run = last_run.with_seed(max(seeds) + 1)
+    group[0] = new_run
+    seeds.add(new_run.seed)
+    group[2] += 1
+    algorithm_workload = os.path.dirname(new_run.result_file).removesuffix("_results") + "_workload.txt"
+    for workload_file in self.workload_files + [algorithm_workload]:
+      if os.path.exists(workload_file):
+        append_to_workload(workload_file, new_run)
+    return [new_run]
+
+  # Records a completed run and returns the runs to add to the workload
+  def finished(self, run):
+    self.record(run)
+    return self._extend(self.groups[_group(run)])
+
+  # Runs to add for groups whose runs were all completed by an earlier execution
+  def resume(self):
+    new_runs = []
+    for group in self.groups.values():
+      new_runs.extend(self._extend(group))
+    return new_runs
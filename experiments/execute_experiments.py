@@ -5,6 +5,29 @@ import datetime
 import os
 import os.path
 import re
+import shutil
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from experiments.adaptive import AdaptiveSeeds
+from experiments.executor import LocalExecutor
+from experiments.grid import expand_configs
+from experiments.instance_cache import InstanceCache
+from experiments.journal import Journal
+from experiments.memory import MemoryEstimator
+from experiments.partitioner_mapping import partitioner_mapping
+from experiments.result_store import ResultStore
+from experiments.results import write_result_csv
+from experiments.runtime import RuntimeEstimator, order_runs, policies
+from experiments.scaling import write_scaling_report
+from experiments.scheduler import CoreScheduler
+from experiments.shared_queue import SharedQueue, SharedQueueScheduler
+from experiments.stragglers import StragglerMonitor
+from experiments.supervisor import AsyncExecutor
+from experiments.topology import CpuAllocator, read_topology
+from experiments.worker_pool import PoolExecutor
+from experiments.workload import is_json_workload, read_workload
 
 
 # Print iterations progress
@@ -21,6 +44,9 @@ def printProgressBar (iteration, total, prefix = '', suffix = '', decimals = 1,
         fill        - Optional  : bar fill character (Str)
         printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
     """
+    if total == 0:
+        # e.g. all runs were restored from the result store
+        return
     percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
     filledLength = int(length * iteration // total)
     bar = "\033[1;92m" + fill * filledLength + "\033[0m" + ' ' * (length - filledLength)
@@ -31,49 +57,231 @@ def printProgressBar (iteration, total, prefix = '', suffix = '', decimals = 1,
 
 parser = argparse.ArgumentParser()
 parser.add_argument("experiment", type=str)
+parser.add_argument("-j", "--cores", type=int, default=1,
+                    help="number of cores that runs are packed onto (parallel runs reserve one core per thread)")
+parser.add_argument("--engine", type=str, choices=["shell", "pool", "async"], default=None,
+                    help="start each run in its own shell (default for workload.txt), execute the wrapper scripts in a "
+                         "pool of long-lived worker processes, which avoids the startup overhead for many short runs, or "
+                         "supervise all runs from a single event loop (no shell, output is streamed; default for workload.jsonl)")
+parser.add_argument("--grace", type=int, default=60,
+                    help="the async engine terminates a run (SIGTERM) at its time limit and kills it (SIGKILL) if it is "
+                         "still alive this many seconds later")
+parser.add_argument("--sample-interval", type=int, default=None,
+                    help="sample memory, active threads and cpu utilization of each run every given milliseconds "
+                         "from /proc into <result>.timeline and summarize them as columns (requires --engine async)")
+parser.add_argument("--pin", action="store_true",
+                    help="pin each run to a disjoint set of cores (recorded in the cpuset and numa_node columns)")
+parser.add_argument("--numa", type=str, choices=["local", "interleave"], default=None,
+                    help="bind the memory of each run to the NUMA nodes of its cores via numactl (requires --pin)")
+parser.add_argument("--memory", type=float, default=None,
+                    help="memory budget in GB; runs are only started if their estimated peak memory fits")
+parser.add_argument("--memory-history", type=str, default=None,
+                    help="file with observed peak memory of earlier runs (default: memory_history.json in the experiment directory)")
+parser.add_argument("--instance-cache", type=str, default=None,
+                    help="node-local directory (e.g. on tmpfs or a local SSD) into which the instances are copied "
+                         "before they are partitioned; the instances of upcoming runs are prefetched")
+parser.add_argument("--instance-cache-size", type=float, default=16,
+                    help="size of the instance cache in GB, least recently used instances are evicted")
+parser.add_argument("--policy", type=str, choices=policies, default="fifo",
+                    help="order of the runs: workload order, longest first (minimizes makespan) or shortest first "
+                         "(maximizes completed runs), based on the running times in the --history csv files")
+parser.add_argument("--history", type=str, nargs="*", default=[],
+                    help="result csv files or folders of earlier experiments used to predict running times "
+                         "(the csv files in the experiment directory are always used)")
+parser.add_argument("--status-interval", type=int, default=60,
+                    help="seconds between updates of status.txt in the experiment directory, which lists the running runs "
+                         "and marks those that take longer than the p99 of comparable runs as stragglers")
+parser.add_argument("--kill-hangs", type=float, default=None,
+                    help="kill and requeue runs that take longer than this multiple of the p99 of comparable runs "
+                         "and used no cpu since the previous status update")
+parser.add_argument("--shared-queue", action="store_true",
+                    help="claim runs from a queue in the experiment directory, so that executors on any number of "
+                         "nodes (sharing the directory) can work on the same workload")
+parser.add_argument("--stale-timeout", type=int, default=600,
+                    help="seconds after which the claims of an executor without heartbeat are taken over (--shared-queue)")
+parser.add_argument("--result-store", type=str, default=None,
+                    help="directory of results shared between experiments: the result of each completed run is "
+                         "stored there, so that setup_experiments.py --result-store can reuse it")
+parser.add_argument("-d", "--directory", type=str, default=None,
+                    help="experiment directory (default: the directory created by setup_experiments.py today)")
+parser.add_argument("--workload", type=str, default=None,
+                    help="execute the runs of this file (.txt or .jsonl) instead of <experiment directory>/workload.jsonl "
+                         "or, if it does not exist, <experiment directory>/workload.txt")
+parser.add_argument("--fresh", action="store_true",
+                    help="discard the journal and all results instead of resuming an interrupted execution")
+parser.add_argument("--on-term", type=str, choices=["kill", "drain"], default="kill",
+                    help="on SIGTERM/SIGINT, kill the running runs (repeated on resume) or wait until they are finished")
 
 args = parser.parse_args()
+if args.numa is not None and not args.pin:
+  parser.error("--numa requires --pin")
+if args.numa is not None and shutil.which("numactl") is None:
+  parser.error("--numa requires numactl")
 
 with open(args.experiment) as json_experiment:
     config = json.load(json_experiment)
 
     now = datetime.datetime.now()
     experiment_dir = str(now.year) + "-" + str(now.month) + "-" + str(now.day) + "_" + config["name"]
-    workload_file = experiment_dir + "/workload.txt"
-    num_lines = sum(1 for line in open(workload_file))
+    if args.directory is not None:
+      experiment_dir = args.directory.rstrip("/")
+    workload_file = experiment_dir + "/workload.jsonl"
+    if not os.path.exists(workload_file):
+      workload_file = experiment_dir + "/workload.txt"
+    if args.workload is not None:
+      workload_file = args.workload
+    if args.engine is None:
+      # structured workloads are executed without shell
+      args.engine = "async" if is_json_workload(workload_file) else "shell"
+    if args.sample_interval is not None and args.engine != "async":
+      parser.error("--sample-interval requires --engine async")
+    if args.numa is not None and args.engine == "pool":
+      parser.error("--numa is not supported by the worker pool")
+    journal_file = experiment_dir + "/journal.txt"
+    queue_dir = experiment_dir + "/queue"
+    runs = read_workload(workload_file)
+    num_lines = len(runs)
+    all_runs = runs
+    if "adaptive_seeds" in config and args.shared_queue:
+      parser.error("adaptive seeds require a single executor (without --shared-queue)")
+
+    scaling = config.get("scaling", False)
+    if scaling and any(run.threads > args.cores for run in runs):
+      print(f"Scaling experiment: runs with more than {args.cores} threads can not get a core per thread")
+      exit(1)
 
-    with open(workload_file) as workload:
-      lines = workload.readlines()
-    lines = [line.rstrip() for line in lines]
+    allocator = None
+    # a scaling experiment pins each run to as many cores as it uses threads
+    if args.pin or scaling:
+      allocator = CpuAllocator(read_topology())
+      if allocator.num_cpus() < args.cores:
+        print(f"Cannot pin runs to {args.cores} cores, only {allocator.num_cpus()} cores are available")
+        exit(1)
 
-    for partitioner_config in config['config']:
+    # the old results are only deleted once the config and the workload are known to be valid
+    algorithm_names = []
+    for partitioner_config, _ in expand_configs(config['config']):
       partitioner = partitioner_config["partitioner"]
       algorithm_name = partitioner
       if "name" in partitioner_config:
         algorithm_name = partitioner_config["name"]
-      os.system("rm " + experiment_dir + "/" + algorithm_name + "_results/*")
+      algorithm_names.append('_'.join(list(map(lambda x: x.lower(), re.split(' |-', algorithm_name)))))
+    if args.fresh:
+      if os.path.exists(journal_file):
+        os.remove(journal_file)
+      shutil.rmtree(queue_dir, ignore_errors=True)
+      for algorithm_name in algorithm_names:
+        os.system("rm -f " + experiment_dir + "/" + algorithm_name + "_results/*")
+
+    if args.shared_queue:
+      queue = SharedQueue(queue_dir, stale_timeout=args.stale_timeout)
+      runs = [run for run in runs if not queue.is_done(run)]
+      mark_completed = queue.mark_done
+    else:
+      journal = Journal(journal_file)
+      runs = [run for run in runs if not journal.is_completed(run)]
+      mark_completed = journal.record
+    completed = num_lines - len(runs)
+    if completed > 0:
+      print(f"Resuming: {completed} of {num_lines} runs are already completed")
+
+    result_store = ResultStore(args.result_store) if args.result_store is not None else None
+
+    adaptive = None
+
+    def run_finished(run, returncode):
+      global completed, num_lines
+      if result_store is not None:
+        header_file = None
+        if partitioner_mapping[run.partitioner].dynamic_header:
+          header_file = os.path.dirname(run.result_file).removesuffix("_results") + ".header.csv"
+        result_store.put(run, executor.columns, header_file)
+      mark_completed(run)
+      completed += 1
+      if adaptive is not None:
+        for new_run in adaptive.finished(run):
+          scheduler.add(new_run)
+          num_lines += 1
+      printProgressBar(completed, num_lines, prefix = "Progress:", suffix = "Completed")
+
+    runtime_estimator = RuntimeEstimator([experiment_dir] + args.history)
+    runs = order_runs(runs, args.policy, runtime_estimator)
+
+    memory_history = args.memory_history if args.memory_history is not None else experiment_dir + "/memory_history.json"
+    estimator = MemoryEstimator(memory_history)
+    memory = int(args.memory * 1024**3) if args.memory is not None else None
+    if args.shared_queue:
+      scheduler = SharedQueueScheduler(runs, args.cores, queue, memory=memory, estimator=estimator)
+    else:
+      scheduler = CoreScheduler(runs, args.cores, memory=memory, estimator=estimator)
+
+    instance_cache = None
+    if args.instance_cache is not None:
+      instance_cache = InstanceCache(args.instance_cache, int(args.instance_cache_size * 1024**3))
+
+    if args.engine == "pool":
+      executor = PoolExecutor(scheduler, on_finish=run_finished, workers=args.cores,
+                              allocator=allocator, instance_cache=instance_cache)
+    elif args.engine == "async":
+      executor = AsyncExecutor(scheduler, on_finish=run_finished, grace=args.grace, sample_interval=args.sample_interval,
+                               allocator=allocator, numa_policy=args.numa, instance_cache=instance_cache)
+    else:
+      executor = LocalExecutor(scheduler, on_finish=run_finished,
+                               allocator=allocator, numa_policy=args.numa, instance_cache=instance_cache)
+
+    if "adaptive_seeds" in config:
+      workload_files = [workload_file] + [experiment_dir + "/" + name for name in ["workload.txt", "workload.jsonl"]
+                                          if os.path.abspath(experiment_dir + "/" + name) != os.path.abspath(workload_file)]
+      adaptive = AdaptiveSeeds(config["adaptive_seeds"], all_runs, workload_files, executor.columns)
+      for run in all_runs:
+        if journal.is_completed(run):
+          adaptive.record(run)
+      for new_run in adaptive.resume():
+        scheduler.add(new_run)
+        num_lines += 1
+
+    # the elapsed time of a running run is compared with the wall time of the wrapper
+    monitor = StragglerMonitor(executor, RuntimeEstimator([experiment_dir] + args.history, metric="wallTime"),
+                               experiment_dir + "/status.txt",
+                               interval=args.status_interval, kill_factor=args.kill_hangs)
+    executor.monitor = monitor
+
+    printProgressBar(completed, num_lines, prefix = "Progress:", suffix = "Completed")
+
+    # a second signal during draining kills the remaining runs
+    def terminate(signum, frame):
+      executor.stop(kill=(args.on_term == "kill" or executor.stopping))
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGINT, terminate)
 
-    i = 0
-    for partitioner_call in lines:
-      printProgressBar(i, num_lines, prefix = "Progress:", suffix = "Completed")
-      os.system(partitioner_call)
-      i = i + 1
-    printProgressBar(num_lines, num_lines, prefix = "Progress:", suffix = "Completed")
+    monitor.start()
+    executor.execute()
+    monitor.stop()
+    if instance_cache is not None:
+      instance_cache.close()
+    if args.shared_queue:
+      for run in executor.lost:
+        queue.release(run)
+      queue.close()
+    else:
+      journal.close()
+    if completed < num_lines:
+      print()
+    if executor.stopping:
+      print(f"Execution interrupted: {num_lines - completed} runs remaining ({len(executor.lost)} killed while running)")
 
-    for partitioner_config in config['config']:
+    algorithm_files = []
+    for partitioner_config, parameters in expand_configs(config['config']):
       partitioner = partitioner_config["partitioner"]
       algorithm_name = partitioner
       if "name" in partitioner_config:
         algorithm_name = partitioner_config["name"]
       algorithm_name = '_'.join(list(map(lambda x: x.lower(), re.split(' |-', algorithm_name))))
-      result_file = experiment_dir + "/" + algorithm_name + ".csv"
-      header_file = experiment_dir + "/" + algorithm_name + ".header.csv"
-      if os.path.exists(result_file):
-        os.remove(result_file)
-      if os.path.exists(header_file):
-        os.system("cat \"" + header_file + "\" >> " + result_file)
-      else:
-        os.system("echo 'algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed' >> " + result_file)
-      os.system("cat " + experiment_dir + "/" + algorithm_name + "_results/* >> " + result_file)
+      write_result_csv(experiment_dir, algorithm_name, executor.columns, parameters)
+      algorithm_files.append(algorithm_name)
 
+    if scaling:
+      write_scaling_report(experiment_dir, algorithm_files)
 
+    if executor.stopping:
+      exit(1)
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+import os
+import os.path
+import subprocess
+import time
+
+from experiments.procfs import kill_tree
+from experiments.results import annotate_result_file
+from experiments.topology import format_cpulist, numactl_prefix
+
+
+# Resource usage of the whole process tree of a run, as reported by wait4
+rusage_columns = ["max_rss_kb", "user_time", "sys_time", "vol_ctx_switches", "invol_ctx_switches", "major_page_faults"]
+
+
+def rusage_info(rusage):
+  return {
+    "max_rss_kb": rusage.ru_maxrss,
+    "user_time": round(rusage.ru_utime, 3),
+    "sys_time": round(rusage.ru_stime, 3),
+    "vol_ctx_switches": rusage.ru_nvcsw,
+    "invol_ctx_switches": rusage.ru_nivcsw,
+    "major_page_faults": rusage.ru_majflt,
+  }
+
+
+# Executes the runs handed out by the scheduler, each in its own shell.
+# The callback is invoked with (run, exit status) whenever a run completes.
+#
+# If a cpu allocator is given, every run is pinned to a disjoint set of cores
+# and optionally its memory is bound to the corresponding NUMA nodes via numactl.
+#
+# If an instance cache is given, runs read their instance from the cache and
+# the instances of the next runs are prefetched while the current runs execute.
+#
+# stop() ends the execution early: no further runs are started and running
+# runs are either drained or killed. Killed runs are collected in `lost`
+# and their partial output is removed (unless they are marked for requeuing).
+class LocalExecutor:
+  def __init__(self, scheduler, on_finish=None, *, allocator=None, numa_policy=None, instance_cache=None) -> None:
+    assert numa_policy is None or allocator is not None, "NUMA placement requires pinning"
+    self.scheduler = scheduler
+    self.on_finish = on_finish
+    self.allocator = allocator
+    self.numa_policy = numa_policy
+    self.instance_cache = instance_cache
+    # optional StragglerMonitor, notified about finished runs
+    self.monitor = None
+    self.running = {}
+    self.stopping = False
+    self.lost = []
+    # columns appended by the executor to each result line
+    self.columns = []
+    if allocator is not None:
+      self.columns.extend(["cpuset", "numa_node"])
+    self.columns.extend(rusage_columns)
+
+  # Prepares the execution of a run and returns its bookkeeping information
+  def prepare(self, run):
+    info = {"killed": False, "peak_rss": None, "argv": run.argv, "command": run.command}
+    # left over from an earlier, interrupted execution
+    if os.path.exists(run.result_file):
+      os.remove(run.result_file)
+    if self.instance_cache is not None:
+      info["instance"] = self.instance_cache.acquire(run.instance)
+      info["argv"], info["command"] = run.call_with_instance(info["instance"])
+    if self.allocator is not None:
+      cpus, nodes = self.allocator.allocate(self.scheduler.required_cores(run))
+      info["cpus"] = cpus
+      info["nodes"] = nodes
+      # ',' would break the csv format
+      info["cpuset"] = format_cpulist(cpus, sep=";")
+      info["numa_node"] = ";".join(str(node) for node in nodes)
+    info["start"] = time.monotonic()
+    return info
+
+  # Releases the resources of a finished run and post-processes its result line
+  def complete(self, run, info) -> None:
+    if self.allocator is not None:
+      self.allocator.release(info["cpus"])
+    if info.get("instance", run.instance) != run.instance:
+      self.instance_cache.release(run.instance)
+    if info["killed"]:
+      if os.path.exists(run.result_file):
+        os.remove(run.result_file)
+    else:
+      annotate_result_file(run.result_file, [info[column] for column in self.columns])
+
+  def launch(self, run) -> None:
+    info = self.prepare(run)
+    command = info["command"]
+    preexec_fn = None
+    if self.allocator is not None:
+      preexec_fn = lambda: os.sched_setaffinity(0, info["cpus"])
+      if self.numa_policy is not None:
+        command = numactl_prefix(self.numa_policy, info["nodes"]) + command
+    proc = subprocess.Popen(command, shell=True, start_new_session=True, preexec_fn=preexec_fn)
+    self.running[proc.pid] = (run, proc, info)
+
+  def wait_any(self):
+    pid, status, rusage = os.wait4(-1, 0)
+    run, proc, info = self.running.pop(pid)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss (in KiB) covers the largest process of the tree, since each
+    # process of a run waits for its children
+    info["peak_rss"] = rusage.ru_maxrss * 1024
+    info.update(rusage_info(rusage))
+    self.complete(run, info)
+    return run, proc.returncode, info
+
+  def stop(self, kill) -> None:
+    self.stopping = True
+    if kill:
+      for pid, (run, proc, info) in self.running.items():
+        info["killed"] = True
+        kill_tree(pid)
+
+  # Starts as many runs as the scheduler allows, returns whether any run is running
+  def launch_pending(self) -> bool:
+    if not self.stopping:
+      for run in self.scheduler.poll():
+        self.launch(run)
+      if self.instance_cache is not None:
+        lookahead = 2 * self.scheduler.cores
+        self.instance_cache.prefetch([run.instance for run in self.scheduler.pending[:lookahead]])
+    if len(self.running) == 0:
+      # e.g. the remaining runs were taken by other executors
+      assert self.stopping or not self.scheduler.has_pending(), "Scheduler did not start any run"
+      return False
+    return True
+
+  def finished(self, run, returncode, info) -> None:
+    if self.monitor is not None:
+      self.monitor.finished(run, info)
+    if info["killed"]:
+      self.scheduler.finish(run)
+      if info.get("requeue", False) and not self.stopping:
+        self.scheduler.add(run)
+      else:
+        self.lost.append(run)
+    else:
+      self.scheduler.finish(run, info["peak_rss"])
+      if self.on_finish is not None:
+        self.on_finish(run, returncode)
+
+  def has_work(self) -> bool:
+    return (self.scheduler.has_pending() and not self.stopping) or len(self.running) > 0
+
+  def execute(self) -> None:
+    while self.has_work():
+      if self.launch_pending():
+        self.finished(*self.wait_any())
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+import itertools
+
+# Parameter grid of a partitioner config in experiment.json:
+#
+#   { "partitioner": "Mt-KaHyPar", "name": "MtKaHyPar", "args": "--verbose=false",
+#     "grid": { "--preset-type": ["default", "quality"], "--r-refine-until-no-improvement": [true, false] } }
+#
+# is expanded into one variant per combination of the values, each with its own
+# name (and thus result folder) and the combination appended to args as
+# <parameter>=<value>:
+#
+#   MtKaHyPar preset_type=default r_refine_until_no_improvement=true  --verbose=false --preset-type=default --r-refine-until-no-improvement=true
+#   ...
+#
+# The values of the parameters are added as columns (named like in the
+# variant names) to the result csv of each variant.
+
+
+def column_name(parameter):
+  return parameter.lstrip("-").replace("-", "_")
+
+
+def _value(value):
+  if isinstance(value, bool):
+    return "true" if value else "false"
+  return str(value)
+
+
+# Yields (partitioner config, parameter columns) for each variant of the given
+# partitioner configs, configs without grid are passed through
+def expand_configs(partitioner_configs):
+  for partitioner_config in partitioner_configs:
+    grid = partitioner_config.get("grid")
+    if grid is None:
+      yield partitioner_config, {}
+      continue
+    assert len(grid) > 0 and all(isinstance(values, list) and len(values) > 0 for values in grid.values()), \
+      f"grid parameters must be non-empty lists: {grid}"
+    base_name = partitioner_config.get("name", partitioner_config["partitioner"])
+    for combination in itertools.product(*grid.values()):
+      columns = {column_name(parameter): _value(value) for parameter, value in zip(grid, combination)}
+      variant = {key: value for key, value in partitioner_config.items() if key != "grid"}
+      variant["name"] = base_name + " " + " ".join(f"{column}={value}" for column, value in columns.items())
+      variant["args"] = " ".join(filter(None, [partitioner_config.get("args"),
+                                               *(f"{parameter}={_value(value)}" for parameter, value in zip(grid, combination))]))
+      yield variant, columns
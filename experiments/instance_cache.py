@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+import collections
+import hashlib
+import ntpath
+import os
+import os.path
+import shutil
+import threading
+
+# Node-local copy of the instances (e.g. on tmpfs or a local SSD), so that the
+# partitioners do not read them from the network file system. The cache is
+# bounded in size; instances which are not used by a running run are evicted
+# in least recently used order.
+#
+# A background thread copies the instances of upcoming runs into the cache
+# while the current runs execute. Runs are never delayed by a copy: a run whose
+# instance is not cached yet (or is still being copied) reads it from its
+# original location, as do runs on instances which do not fit into the cache
+# (next to the instances in use).
+#
+#  <cache dir>/<hash of the instance path>/<instance file name>
+#
+# The copies keep the file name of the instance, since it is reported as graph
+# name. They are reused by later executions as long as size and modification
+# time of the instance are unchanged. Each executor needs its own cache dir.
+
+
+def _key(instance):
+  return hashlib.sha1(os.path.abspath(instance).encode()).hexdigest()[:16]
+
+
+class InstanceCache:
+  def __init__(self, cache_dir, capacity: int) -> None:
+    self.cache_dir = os.path.abspath(cache_dir)
+    self.capacity = capacity
+    self.lock = threading.Condition()
+    # key -> size of the cached copy, in least recently used order
+    self.entries = collections.OrderedDict()
+    self.in_use = collections.Counter()
+    self.copying = set()
+    # instances of the upcoming runs and those which did not fit
+    self.upcoming = []
+    self.rejected = set()
+    self.closed = False
+    os.makedirs(self.cache_dir, exist_ok=True)
+    self._scan()
+    self.thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+    self.thread.start()
+
+  # Registers the copies left by earlier executions
+  def _scan(self) -> None:
+    key_dirs = [entry for entry in os.scandir(self.cache_dir) if entry.is_dir()]
+    for key_dir in sorted(key_dirs, key=lambda entry: entry.stat().st_mtime):
+      files = []
+      for entry in os.scandir(key_dir.path):
+        if entry.name.endswith(".tmp"):
+          # interrupted copy
+          os.remove(entry.path)
+        else:
+          files.append(entry)
+      if len(files) == 1:
+        self.entries[key_dir.name] = files[0].stat().st_size
+      else:
+        shutil.rmtree(key_dir.path)
+
+  def cached_path(self, instance):
+    return f"{self.cache_dir}/{_key(instance)}/{ntpath.basename(instance)}"
+
+  def _is_valid(self, instance) -> bool:
+    try:
+      cached = os.stat(self.cached_path(instance))
+    except FileNotFoundError:
+      return False
+    original = os.stat(instance)
+    return cached.st_size == original.st_size and int(cached.st_mtime) == int(original.st_mtime)
+
+  def _evict(self, key) -> None:
+    del self.entries[key]
+    shutil.rmtree(f"{self.cache_dir}/{key}", ignore_errors=True)
+
+  # Evicts unused copies until the given size fits, without touching the keys to keep
+  def _make_room(self, size, keep) -> bool:
+    used = sum(self.entries.values())
+    for key in list(self.entries):
+      if used + size <= self.capacity:
+        break
+      if self.in_use[key] == 0 and key not in self.copying and key not in keep:
+        used -= self.entries[key]
+        self._evict(key)
+    return used + size <= self.capacity
+
+  # Copies the instance into the cache (if necessary) and returns whether it
+  # is cached. Must be called with the lock held, which is released while copying.
+  def _stage(self, instance, keep) -> bool:
+    key = _key(instance)
+    while key in self.copying:
+      self.lock.wait()
+    if key in self.entries:
+      if self._is_valid(instance):
+        self.entries.move_to_end(key)
+        return True
+      self._evict(key)
+
+    try:
+      size = os.path.getsize(instance)
+    except OSError:
+      # reported by the partitioner
+      self.rejected.add(key)
+      return False
+    if not self._make_room(size, keep):
+      self.rejected.add(key)
+      return False
+    # reserve the space before copying
+    self.entries[key] = size
+    self.copying.add(key)
+    self.lock.release()
+    copied = False
+    try:
+      path = self.cached_path(instance)
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      shutil.copy2(instance, path + ".tmp")
+      os.rename(path + ".tmp", path)
+      copied = True
+    except OSError as e:
+      print(f"Could not cache {instance}: {e}")
+    finally:
+      self.lock.acquire()
+      self.copying.discard(key)
+      if not copied:
+        self._evict(key)
+        self.rejected.add(key)
+      self.lock.notify_all()
+    return copied
+
+  # Returns the path under which a run should read the instance, without
+  # copying or waiting for a copy. Each call must be followed by release()
+  # once the run is finished.
+  def acquire(self, instance):
+    with self.lock:
+      key = _key(instance)
+      if key not in self.entries or key in self.copying:
+        return instance
+      if not self._is_valid(instance):
+        # the instance changed, it is copied again by the prefetching
+        if self.in_use[key] == 0:
+          self._evict(key)
+          self.lock.notify_all()
+        return instance
+      self.entries.move_to_end(key)
+      self.in_use[key] += 1
+      os.utime(f"{self.cache_dir}/{key}")
+      return self.cached_path(instance)
+
+  def release(self, instance) -> None:
+    with self.lock:
+      key = _key(instance)
+      if self.in_use[key] > 0:
+        self.in_use[key] -= 1
+
+  # Instances of the next runs, in the order in which they are needed
+  def prefetch(self, instances) -> None:
+    with self.lock:
+      self.upcoming = list(dict.fromkeys(instances))
+      # instances that did not fit may fit now
+      self.rejected.clear()
+      self.lock.notify_all()
+
+  def _prefetch_loop(self) -> None:
+    with self.lock:
+      while not self.closed:
+        keep = {_key(instance) for instance in self.upcoming}
+        for instance in self.upcoming:
+          key = _key(instance)
+          if key not in self.entries and key not in self.rejected:
+            self._stage(instance, keep)
+            # the upcoming instances may have changed in the meantime
+            break
+        else:
+          self.lock.wait()
+
+  def close(self) -> None:
+    with self.lock:
+      self.closed = True
+      self.lock.notify_all()
@@ -0,0 +1,32 @@
+#!/usr/bin/python3
+import os
+import os.path
+
+# Append-only journal of completed runs. Each line holds the id of one run and
+# is synced to disk before the run counts as completed, so that a restarted
+# executor can skip everything that finished before a crash or a walltime kill.
+
+
+class Journal:
+  def __init__(self, journal_file) -> None:
+    self.journal_file = journal_file
+    self.completed = set()
+    if os.path.exists(journal_file):
+      with open(journal_file) as journal:
+        content = journal.read()
+      # a line without newline was not completely written before a crash
+      for line in content.split("\n")[:-1]:
+        if line.strip() != "":
+          self.completed.add(line.strip())
+    self.fd = os.open(journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+  def is_completed(self, run) -> bool:
+    return run.id in self.completed
+
+  def record(self, run) -> None:
+    os.write(self.fd, (run.id + "\n").encode())
+    os.fsync(self.fd)
+    self.completed.add(run.id)
+
+  def close(self) -> None:
+    os.close(self.fd)
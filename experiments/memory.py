@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+import fcntl
+import json
+import ntpath
+import os
+import os.path
+import socket
+
+from experiments.partitioner_mapping import partitioner_mapping
+
+# Estimates the peak memory of a run, so that the scheduler only starts runs
+# that fit into the memory budget. The estimate is based on (in this order)
+#  - the peak RSS of earlier runs of the same algorithm on the same instance,
+#  - the peak RSS of earlier runs of the same algorithm on other instances,
+#  - a generic bytes-per-pin model scaled with the memory factor of the partitioner.
+
+# generic model, deliberately on the safe side
+default_bytes_per_pin = 400
+default_base_bytes = 64 * 1024 * 1024
+safety_factor = 1.2
+# approximate size of a pin in an hMetis file, which has no pin count in its header
+hmetis_bytes_per_pin = 6
+
+
+def instance_format(partitioner, instance):
+  formats = partitioner_mapping[partitioner].format
+  if len(formats) == 1:
+    return formats[0]
+  if instance.endswith(".graph") or instance.endswith(".metis"):
+    return "graph"
+  if instance.endswith(".scotch"):
+    return "scotch"
+  return "hmetis"
+
+
+def _header(instance, skip_comments=True):
+  with open(instance) as f:
+    for line in f:
+      if skip_comments and line.startswith("%"):
+        continue
+      if line.strip() != "":
+        return [int(value) for value in line.split()]
+  return []
+
+
+# Returns (n, m, pins) of an instance using only its header
+def read_instance_size(instance, input_format):
+  if input_format in ["patoh", "zoltan"]:
+    # <index base> <#cells> <#nets> <#pins> [<weight scheme>]
+    _, n, m, pins = _header(instance)[:4]
+  elif input_format in ["graph", "metis"]:
+    # <#nodes> <#edges> [<fmt>]
+    n, m = _header(instance)[:2]
+    pins = 2 * m
+  elif input_format == "scotch":
+    # version line, then <#vertices> <#arcs>
+    with open(instance) as f:
+      f.readline()
+      n, arcs = [int(value) for value in f.readline().split()[:2]]
+    m = arcs // 2
+    pins = arcs
+  else:
+    # hMetis: <#hyperedges> <#nodes> [<fmt>]
+    m, n = _header(instance)[:2]
+    pins = max(os.path.getsize(instance) // hmetis_bytes_per_pin, m)
+  return n, m, pins
+
+
+class MemoryEstimator:
+  def __init__(self, history_file=None) -> None:
+    self.history_file = history_file
+    self.sizes = {}
+    # algorithm -> instance -> [peak rss in bytes, size]
+    self.history = {}
+    if history_file is not None and os.path.exists(history_file):
+      with open(history_file) as f:
+        self.history = json.load(f)
+
+  def instance_size(self, run) -> int:
+    if run.instance not in self.sizes:
+      try:
+        n, m, pins = read_instance_size(run.instance, instance_format(run.partitioner, run.instance))
+        self.sizes[run.instance] = n + m + pins
+      except (OSError, ValueError):
+        self.sizes[run.instance] = os.path.getsize(run.instance) if os.path.exists(run.instance) else 0
+    return self.sizes[run.instance]
+
+  def estimate(self, run) -> int:
+    size = self.instance_size(run)
+    observed = self.history.get(run.algorithm, {})
+    instance = ntpath.basename(run.instance)
+    if instance in observed:
+      return int(safety_factor * observed[instance][0])
+    if len(observed) > 0:
+      # assume that memory grows monotonically with the instance size: a larger
+      # instance gives an upper bound, otherwise scale the largest observed instance
+      larger = [peak for peak, observed_size in observed.values() if observed_size >= size]
+      if len(larger) > 0:
+        return int(safety_factor * min(larger))
+      peak, observed_size = max(observed.values(), key=lambda entry: entry[1])
+      return int(safety_factor * peak * size / max(observed_size, 1))
+    return int(default_base_bytes + default_bytes_per_pin * partitioner_mapping[run.partitioner].memory_factor * size)
+
+  def record(self, run, peak_rss) -> None:
+    observed = self.history.setdefault(run.algorithm, {})
+    instance = ntpath.basename(run.instance)
+    previous = observed.get(instance, [0, 0])[0]
+    observed[instance] = [max(previous, peak_rss), self.instance_size(run)]
+    if self.history_file is not None:
+      self._write()
+
+  # Merges the history with the observations written by other executors in
+  # the meantime (the larger peak wins) and writes it, under a lock file
+  def _write(self) -> None:
+    with open(self.history_file + ".lock", "a") as lock:
+      fcntl.lockf(lock, fcntl.LOCK_EX)
+      try:
+        if os.path.exists(self.history_file):
+          with open(self.history_file) as f:
+            stored = json.load(f)
+          for algorithm, stored_observed in stored.items():
+            observed = self.history.setdefault(algorithm, {})
+            for instance, (peak, size) in stored_observed.items():
+              if instance not in observed or observed[instance][0] < peak:
+                observed[instance] = [peak, size]
+        # unique name, several executors may share the history file
+        tmp_file = f"{self.history_file}.{socket.gethostname()}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+          json.dump(self.history, f)
+        os.replace(tmp_file, self.history_file)
+      finally:
+        fcntl.lockf(lock, fcntl.LOCK_UN)
@@ -9,6 +9,7 @@ class Partitioner:
         *,
         parallel: bool,
         dynamic_header: bool = False,
+        memory_factor: float = 1.0,
     ) -> None:
         self.script = script
         if isinstance(format, str):
@@ -17,15 +18,19 @@ class Partitioner:
             self.format = format
         self.parallel = parallel
         self.dynamic_header = dynamic_header
+        # relative memory demand, used to estimate the memory of a run before any run was observed
+        self.memory_factor = memory_factor
 
 
 partitioner_mapping = {
-    "Mt-KaHyPar":       Partitioner("mt_kahypar", ["graph", "hmetis"], parallel=True, dynamic_header=True),
+    # the multilevel hierarchy, the partitioned hypergraph with its connectivity sets
+    # and the thread-local refinement data (e.g. flow networks) dominate the input
+    "Mt-KaHyPar":       Partitioner("mt_kahypar", ["graph", "hmetis"], parallel=True, dynamic_header=True, memory_factor=8.0),
     "hMetis-R":         Partitioner("hmetis_rb", "hmetis", parallel=False),
     "hMetis-K":         Partitioner("hmetis_k", "hmetis", parallel=False),
-    "PaToH-S":          Partitioner("patoh_s", "patoh", parallel=False),
-    "PaToH-D":          Partitioner("patoh_d", "patoh", parallel=False),
-    "PaToH-Q":          Partitioner("patoh_q", "patoh", parallel=False),
+    "PaToH-S":          Partitioner("patoh_s", "patoh", parallel=False, memory_factor=4.0),
+    "PaToH-D":          Partitioner("patoh_d", "patoh", parallel=False, memory_factor=4.0),
+    "PaToH-Q":          Partitioner("patoh_q", "patoh", parallel=False, memory_factor=4.0),
     "KaHyPar-CA":       Partitioner("kahypar_ca", "hmetis", parallel=False),
     "KaHyPar-K":        Partitioner("kahypar_k", "hmetis", parallel=False),
     "KaHyPar-R":        Partitioner("kahypar_r", "hmetis", parallel=False),
@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+import os
+import signal
+
+# Helpers for inspecting processes via /proc. The wrapper scripts start the
+# partitioners in new sessions (os.setsid), so a run is only completely
+# covered by walking the process tree, not by its process group.
+
+
+def children(pid):
+  result = []
+  try:
+    for tid in os.listdir(f"/proc/{pid}/task"):
+      with open(f"/proc/{pid}/task/{tid}/children") as f:
+        result.extend(int(child) for child in f.read().split())
+  except (FileNotFoundError, ProcessLookupError):
+    pass
+  return result
+
+
+def process_tree(pid):
+  tree = [pid]
+  i = 0
+  while i < len(tree):
+    tree.extend(children(tree[i]))
+    i += 1
+  return tree
+
+
+def kill_tree(pid, sig=signal.SIGKILL, include_root=True):
+  # collect the tree first, killing the root re-parents its children
+  for p in process_tree(pid)[(0 if include_root else 1):]:
+    try:
+      os.kill(p, sig)
+    except ProcessLookupError:
+      pass
+
+
+page_size_kb = os.sysconf("SC_PAGE_SIZE") // 1024
+clock_ticks = os.sysconf("SC_CLK_TCK")
+
+
+def _stat_fields(stat_file):
+  with open(stat_file) as f:
+    stat = f.read()
+  # the command name may contain spaces and parentheses
+  return stat[stat.rindex(")") + 2:].split()
+
+
+# Returns (cpu time in clock ticks, rss in KiB, number of running threads)
+# of a single process, or None if it terminated in the meantime
+def process_stats(pid):
+  try:
+    fields = _stat_fields(f"/proc/{pid}/stat")
+    running = 0
+    for tid in os.listdir(f"/proc/{pid}/task"):
+      try:
+        if _stat_fields(f"/proc/{pid}/task/{tid}/stat")[0] == "R":
+          running += 1
+      except FileNotFoundError:
+        pass
+  except (FileNotFoundError, ProcessLookupError):
+    return None
+  # fields start with the state (field 3 in proc(5))
+  return int(fields[11]) + int(fields[12]), int(fields[21]) * page_size_kb, running
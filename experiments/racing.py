@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+import math
+import os.path
+import statistics
+
+from experiments.results import read_result_row
+from experiments.runtime import invalid
+
+# Racing of the variants of a parameter grid (see grid.py), executed by
+# tune_experiments.py. The settings are given in experiment.json:
+#
+#   "tuning": {"budget": 50, "initial_instances": 5, "eta": 2, "alpha": 0.05}
+#
+# Round r runs the surviving variants on the initial_instances * eta^r smallest
+# instances of the workload (by file size, with all k, epsilons, threads and
+# seeds), i.e. survivors are evaluated on more and larger instances. After each
+# round, the variants which are statistically dominated in (objective, time)
+# are dropped: A dominates B if the geometric mean ratios of both metrics over
+# the instances of the round are at most one, and a one-sided sign test shows
+# that A is better in at least one of them (significance alpha). Then at most
+# 1/eta of the variants survive, ranked by Pareto front of their geometric mean
+# ratios to the best variant; the first front always survives.
+#
+# The tuning ends when a single variant is left, all instances have been used
+# or the budget (in cpu hours, user + sys time of the runs) is exhausted.
+#
+# Values are compared per cell (instance, k, epsilon, threads) as the mean over
+# the seeds. A cell in which all runs of a variant failed or timed out gets twice
+# the worst value of the other variants. The objective is compared as value + 1
+# (it may be zero), the time with a floor of one millisecond.
+
+time_metric = "totalPartitionTime"
+
+
+def _sign_test(wins, losses):
+  # one-sided p-value of at least `wins` successes in wins + losses fair coin flips
+  n = wins + losses
+  if n == 0:
+    return 1.0
+  return sum(math.comb(n, i) for i in range(wins, n + 1)) / 2**n
+
+
+def _objective_shift(value):
+  return value + 1
+
+
+def _time_shift(value):
+  return max(value, 0.001)
+
+
+def pareto_fronts(points):
+  # points: name -> (x, y), smaller is better in both
+  remaining = dict(points)
+  fronts = []
+  while len(remaining) > 0:
+    front = [name for name, (x, y) in remaining.items()
+             if not any(ox <= x and oy <= y and (ox, oy) != (x, y) for ox, oy in remaining.values())]
+    fronts.append(front)
+    for name in front:
+      del remaining[name]
+  return fronts
+
+
+class Racing:
+  def __init__(self, settings, runs, objective, executor_columns=()) -> None:
+    self.budget = settings["budget"] * 3600
+    self.initial_instances = settings.get("initial_instances", 5)
+    self.eta = settings.get("eta", 2)
+    self.alpha = settings.get("alpha", 0.05)
+    assert self.eta > 1, "eta must be larger than one"
+    self.objective = objective
+    self.executor_columns = executor_columns
+    self.runs = runs
+    self.variants = list(dict.fromkeys(run.algorithm for run in runs))
+    self.instances = sorted(dict.fromkeys(run.instance for run in runs), key=lambda instance: (os.path.getsize(instance), instance))
+    # run id -> (objective, time), None if the run failed or timed out
+    self.values = {}
+    self.completed = set()
+    self.cpu_seconds = 0.0
+    # variant -> round in which it was eliminated
+    self.eliminated = {}
+
+  # Number of instances used in the given round
+  def num_instances(self, round):
+    return min(len(self.instances), self.initial_instances * self.eta**round)
+
+  def is_last_round(self, round):
+    return self.num_instances(round) == len(self.instances)
+
+  def round_runs(self, round, survivors):
+    instances = set(self.instances[:self.num_instances(round)])
+    order = {instance: i for i, instance in enumerate(self.instances)}
+    runs = [run for run in self.runs if run.algorithm in survivors and run.instance in instances]
+    # smallest instances first, such that an exhausted budget leaves complete instances
+    return sorted(runs, key=lambda run: order[run.instance])
+
+  def budget_exhausted(self):
+    return self.cpu_seconds >= self.budget
+
+  def record(self, run) -> None:
+    if run.id in self.completed:
+      return
+    self.completed.add(run.id)
+    row = read_result_row(run.result_file, self.executor_columns)
+    if row is None:
+      self.values[run.id] = None
+      return
+    try:
+      self.cpu_seconds += float(row.get("user_time", 0)) + float(row.get("sys_time", 0))
+    except ValueError:
+      pass
+    try:
+      values = (float(row[self.objective]), float(row[time_metric]))
+    except (KeyError, ValueError):
+      values = None
+    if row.get("timeout") == "yes" or row.get("failed") == "yes" or values is None or invalid in values:
+      self.values[run.id] = None
+    else:
+      self.values[run.id] = values
+
+  # Instances of the round on which all runs of the given variants are completed
+  def complete_instances(self, round, variants):
+    instances = self.instances[:self.num_instances(round)]
+    incomplete = {run.instance for run in self.round_runs(round, variants) if run.id not in self.completed}
+    return [instance for instance in instances if instance not in incomplete]
+
+  # variant -> cell -> (objective, time), with penalties for failed cells
+  def _cells(self, variants, instances):
+    instances = set(instances)
+    seeds = {}
+    for run in self.runs:
+      if run.algorithm in variants and run.instance in instances and run.id in self.values:
+        cell = (run.instance, run.k, run.epsilon, run.threads)
+        seeds.setdefault(run.algorithm, {}).setdefault(cell, [])
+        if self.values[run.id] is not None:
+          seeds[run.algorithm][cell].append(self.values[run.id])
+    cells = {variant: {} for variant in variants}
+    all_cells = {cell for by_cell in seeds.values() for cell in by_cell}
+    for cell in all_cells:
+      means = {}
+      for variant in variants:
+        values = seeds.get(variant, {}).get(cell, [])
+        if len(values) > 0:
+          means[variant] = (statistics.mean(value[0] for value in values), statistics.mean(value[1] for value in values))
+      if len(means) == 0:
+        continue
+      penalty = (2 * max(value[0] for value in means.values()) + 1,
+                 2 * _time_shift(max(value[1] for value in means.values())))
+      for variant in variants:
+        cells[variant][cell] = means.get(variant, penalty)
+    return cells
+
+  def _dominates(self, a, b):
+    cells = sorted(a.keys() & b.keys())
+    if len(cells) == 0:
+      return False
+    significant = False
+    for index, shift in [(0, _objective_shift), (1, _time_shift)]:
+      ratios = [math.log(shift(a[cell][index]) / shift(b[cell][index])) for cell in cells]
+      if statistics.mean(ratios) > 0:
+        return False
+      wins = sum(1 for ratio in ratios if ratio < 0)
+      losses = sum(1 for ratio in ratios if ratio > 0)
+      significant = significant or _sign_test(wins, losses) < self.alpha
+    return significant
+
+  # variant -> (objective ratio, time ratio): geometric mean ratios to the best value per cell
+  def scores(self, variants, instances):
+    cells = self._cells(variants, instances)
+    common = set.intersection(*(set(by_cell) for by_cell in cells.values())) if len(cells) > 0 else set()
+    scores = {}
+    for variant in variants:
+      ratios = ([], [])
+      for cell in common:
+        for index, shift in [(0, _objective_shift), (1, _time_shift)]:
+          best = min(shift(cells[other][cell][index]) for other in variants)
+          ratios[index].append(math.log(shift(cells[variant][cell][index]) / best))
+      scores[variant] = tuple(math.exp(statistics.mean(r)) if len(r) > 0 else math.nan for r in ratios)
+    return scores
+
+  # Drops the dominated variants after the given round and returns the survivors
+  def eliminate(self, round, survivors):
+    instances = self.complete_instances(round, survivors)
+    cells = self._cells(survivors, instances)
+    dominated = {b for b in survivors for a in survivors if a != b and self._dominates(cells[a], cells[b])}
+    remaining = [variant for variant in survivors if variant not in dominated]
+    scores = self.scores(remaining, instances)
+    fronts = pareto_fronts(scores)
+    ranked = [variant for front in fronts for variant in sorted(front, key=lambda variant: sum(map(math.log, scores[variant])))]
+    keep = max(math.ceil(len(survivors) / self.eta), len(fronts[0]) if len(fronts) > 0 else 0)
+    for variant in survivors:
+      if variant in dominated or variant not in ranked[:keep]:
+        self.eliminated[variant] = round
+    return [variant for variant in survivors if variant not in self.eliminated]
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+import hashlib
+import json
+import os
+import os.path
+import re
+import socket
+
+from experiments.results import default_header, read_result_row, stored_values_file
+
+# Persistent store of run results which is shared between experiments, so that
+# repeating an experiment (e.g. with an additional k or seed) only executes the
+# runs that were not executed before.
+#
+# A run is identified by the content of its instance, the wrapper script (and
+# the local modules it imports), the binaries and config files the script reads
+# from the environment (see env.sh), and the full call: positional arguments,
+# name, args, config file (by content) and tag. The result file and the header
+# option do not belong to the key.
+#
+#  <store dir>/hashes.json              content hashes of files by path, size and mtime
+#  <store dir>/results/<xx>/<key>.json  output of the wrapper script, values of the
+#                                       executor columns and the dynamic header
+#
+# Runs which write partition files are not stored, and neither are failed or
+# timed out runs (e.g. killed for lack of memory), which are executed again.
+
+_environment_variable = re.compile(r"""environ(?:\.get\(|\[)\s*["'](\w+)["']""")
+_local_import = re.compile(r"^(?:from|import)\s+(\w+)", re.MULTILINE)
+
+
+def _failed(row) -> bool:
+  return row.get("failed") == "yes" or row.get("timeout") == "yes"
+
+
+def _atomic_write_json(path, value) -> None:
+  # unique name, several executors may share the store
+  tmp_file = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+  with open(tmp_file, "w") as f:
+    json.dump(value, f)
+  os.replace(tmp_file, path)
+
+
+class ResultStore:
+  def __init__(self, store_dir) -> None:
+    self.store_dir = os.path.abspath(store_dir)
+    os.makedirs(self.store_dir + "/results", exist_ok=True)
+    self.hashes_file = self.store_dir + "/hashes.json"
+    self.hashes = {}
+    if os.path.exists(self.hashes_file):
+      with open(self.hashes_file) as f:
+        self.hashes = json.load(f)
+    self.scripts = {}
+
+  # Content hash of a file, recomputed only if its size or modification time changed
+  def file_hash(self, path):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    cached = self.hashes.get(path)
+    if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+      return cached[2]
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+      for block in iter(lambda: f.read(1 << 20), b""):
+        sha.update(block)
+    self.hashes[path] = [stat.st_size, stat.st_mtime, sha.hexdigest()]
+    _atomic_write_json(self.hashes_file, self.hashes)
+    return sha.hexdigest()
+
+  def _environment_value(self, value):
+    if value is not None and os.path.isfile(value):
+      return self.file_hash(value)
+    return value
+
+  # Hashes of the wrapper script and its local modules, and the environment they read
+  def _script_description(self, script):
+    if script not in self.scripts:
+      script_dir = os.path.dirname(script)
+      sources = [script]
+      with open(script) as f:
+        source = f.read()
+      sources.extend(f"{script_dir}/{module}.py" for module in _local_import.findall(source)
+                     if os.path.exists(f"{script_dir}/{module}.py"))
+      variables = set()
+      for path in sources:
+        with open(path) as f:
+          variables.update(_environment_variable.findall(f.read()))
+      self.scripts[script] = {
+        "sources": [self.file_hash(path) for path in sources],
+        "environment": {variable: self._environment_value(os.environ.get(variable)) for variable in sorted(variables)},
+      }
+    return self.scripts[script]
+
+  # Returns the key of a run, or None if its result can not be stored
+  def key(self, run):
+    arguments = []
+    i = 1
+    while i < len(run.argv):
+      arg = run.argv[i]
+      if arg.startswith("--partition_folder"):
+        return None
+      if arg == "--header":
+        i += 2
+        continue
+      if arg.startswith("--header="):
+        i += 1
+        continue
+      if arg == run.instance:
+        arg = "instance:" + self.file_hash(run.instance)
+      elif arg == "--config" and i + 1 < len(run.argv):
+        arguments.append(arg)
+        i += 1
+        arg = "config:" + self._environment_value(run.argv[i])
+      arguments.append(arg)
+      i += 1
+    description = {
+      "script": self._script_description(os.path.abspath(run.argv[0])),
+      "arguments": arguments,
+      "tag": run.tag,
+    }
+    return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+  def _entry_file(self, key):
+    return f"{self.store_dir}/results/{key[:2]}/{key}.json"
+
+  def get(self, run):
+    key = self.key(run)
+    if key is None or not os.path.exists(self._entry_file(key)):
+      return None
+    with open(self._entry_file(key)) as f:
+      entry = json.load(f)
+    # failed runs stored by earlier versions
+    header = entry["header"] if entry["header"] is not None else list(default_header)
+    fields = entry["output"][-1].split(",")
+    if _failed(dict(zip(header, fields[max(len(fields) - len(header), 0):]))):
+      return None
+    return entry
+
+  # Stores the result file of a finished run, whose last line ends with the
+  # values of the given executor columns
+  def put(self, run, columns, header_file=None) -> None:
+    key = self.key(run)
+    if key is None:
+      return
+    row = read_result_row(run.result_file, columns)
+    if row is None or _failed(row):
+      return
+    with open(run.result_file) as f:
+      lines = [line for line in f.read().split("\n") if line.strip() != ""]
+    values = {}
+    if len(columns) > 0:
+      fields = lines[-1].split(",")
+      lines[-1] = ",".join(fields[:-len(columns)])
+      values = dict(zip(columns, fields[-len(columns):]))
+    header = None
+    if header_file is not None and os.path.exists(header_file):
+      with open(header_file) as f:
+        header = f.readline().strip().split(",")
+      if len(columns) > 0 and header[-len(columns):] == list(columns):
+        header = header[:-len(columns)]
+    os.makedirs(os.path.dirname(self._entry_file(key)), exist_ok=True)
+    _atomic_write_json(self._entry_file(key), {"output": lines, "columns": values, "header": header})
+
+  # Writes the result file of a run from its stored entry. The values of the
+  # executor columns are added when the result csv is written.
+  def restore(self, run, entry, header_file=None) -> None:
+    with open(run.result_file, "w") as f:
+      f.write("\n".join(entry["output"]) + "\n")
+    with open(stored_values_file(run.result_file), "w") as f:
+      json.dump(entry["columns"], f)
+    if header_file is not None and entry["header"] is not None and not os.path.exists(header_file):
+      with open(header_file, "w") as f:
+        f.write(",".join(entry["header"]) + "\n")
@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+import contextlib
+import fcntl
+import json
+import os
+import os.path
+import socket
+
+# CSV format of the wrapper scripts (see scripts/*.py)
+default_header = ["algorithm", "graph", "timeout", "seed", "k", "epsilon", "num_threads", "imbalance",
+                  "totalPartitionTime", "objective", "km1", "cut", "failed",
+                  "wallTime", "firstOutputTime", "reportedPartitionTime", "ioTime"]
+
+
+def _append_values(output, values):
+  lines = output.split("\n")
+  while len(lines) > 0 and lines[-1].strip() == "":
+    lines.pop()
+  if len(lines) == 0:
+    return output
+  lines[-1] += "," + ",".join(str(value) for value in values)
+  return "\n".join(lines) + "\n"
+
+
+# Appends executor-side values (e.g. the cpuset of the run) to the result line
+# written by the wrapper script. Does nothing if the wrapper did not produce a line.
+def annotate_result_file(result_file, values):
+  if len(values) == 0 or not os.path.exists(result_file):
+    return
+  with open(result_file) as f:
+    output = f.read()
+  with open(result_file, "w") as f:
+    f.write(_append_values(output, values))
+
+
+# Executor-side values of a result restored from the result store
+def stored_values_file(result_file):
+  return result_file.removesuffix(".results") + ".stored"
+
+
+def read_header(header_file):
+  with open(header_file) as f:
+    return f.readline().strip().split(",")
+
+
+# Values of the last result line of a run by column, None if the run produced
+# no line. The header file of the algorithm (if any) may or may not already
+# contain the given executor columns.
+def read_result_row(result_file, executor_columns=()):
+  if not os.path.exists(result_file):
+    return None
+  with open(result_file) as f:
+    lines = [line for line in f.read().split("\n") if line.strip() != ""]
+  if len(lines) == 0:
+    return None
+  header_file = os.path.dirname(result_file).removesuffix("_results") + ".header.csv"
+  header = read_header(header_file) if os.path.exists(header_file) else list(default_header)
+  if len(executor_columns) > 0 and header[-len(executor_columns):] == list(executor_columns):
+    header = header[:-len(executor_columns)]
+  header = header + list(executor_columns)
+  fields = lines[-1].split(",")
+  # e.g. a tag prepended to the line
+  offset = len(fields) - len(header)
+  return dict(zip(header, fields[max(offset, 0):]))
+
+
+# Writes the header file of an algorithm, extended by the columns the executor
+# appends to each result line. Calling this repeatedly is idempotent.
+def write_header(header_file, extra_columns):
+  header = read_header(header_file) if os.path.exists(header_file) else list(default_header)
+  if len(extra_columns) > 0 and header[-len(extra_columns):] == list(extra_columns):
+    header = header[:-len(extra_columns)]
+  with open(header_file, "w") as f:
+    f.write(",".join(header + list(extra_columns)) + "\n")
+
+
+# Several executors (e.g. the tasks of a slurm job array) may write the result
+# csv files of an experiment concurrently, they are serialized by a lock file in
+# the experiment directory (POSIX locks also work on NFS)
+@contextlib.contextmanager
+def _experiment_lock(experiment_dir):
+  with open(experiment_dir + "/.results.lock", "a") as lock:
+    fcntl.lockf(lock, fcntl.LOCK_EX)
+    try:
+      yield
+    finally:
+      fcntl.lockf(lock, fcntl.LOCK_UN)
+
+
+# Collects the results of one algorithm into <algorithm_file>.csv. The values of
+# the grid parameters of the algorithm (see grid.py) are appended to each row.
+def write_result_csv(experiment_dir, algorithm_file, extra_columns=(), parameters={}):
+  with _experiment_lock(experiment_dir):
+    _write_result_csv(experiment_dir, algorithm_file, extra_columns, parameters)
+
+
+def _write_result_csv(experiment_dir, algorithm_file, extra_columns, parameters):
+  result_file = experiment_dir + "/" + algorithm_file + ".csv"
+  header_file = experiment_dir + "/" + algorithm_file + ".header.csv"
+  result_dir = experiment_dir + "/" + algorithm_file + "_results"
+  if len(extra_columns) > 0:
+    write_header(header_file, extra_columns)
+  header = read_header(header_file) if os.path.exists(header_file) else default_header
+  # readers never see a partially written file
+  tmp_file = f"{result_file}.{socket.gethostname()}.{os.getpid()}.tmp"
+  with open(tmp_file, "w") as csv:
+    csv.write(",".join(header + list(parameters)) + "\n")
+    if os.path.isdir(result_dir):
+      for name in sorted(os.listdir(result_dir)):
+        if name.endswith(".results"):
+          with open(result_dir + "/" + name) as results:
+            output = results.read()
+          stored_file = stored_values_file(result_dir + "/" + name)
+          if len(extra_columns) > 0 and os.path.exists(stored_file):
+            with open(stored_file) as f:
+              stored = json.load(f)
+            output = _append_values(output, [stored.get(column, "") for column in extra_columns])
+          if len(parameters) > 0:
+            output = _append_values(output, parameters.values())
+          csv.write(output)
+  os.replace(tmp_file, result_file)
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+import csv
+import glob
+import math
+import ntpath
+import os.path
+import statistics
+
+# Predicts the running time of a run from the result csv files of earlier
+# experiments (e.g. examples/reference_csv/*.csv) and orders the workload
+# according to a scheduling policy:
+#  - fifo: keep the workload order
+#  - lpt:  longest processing time first, minimizes the makespan
+#  - spt:  shortest processing time first, maximizes the number of completed
+#          runs if the allocation ends before the workload is finished
+
+policies = ["fifo", "lpt", "spt"]
+
+invalid = 2147483647
+
+
+def _graph_name(instance):
+  name = ntpath.basename(instance)
+  # some wrappers report the name without format specific suffix
+  for suffix in [".zoltan.hg", ".mondriaan.mtx"]:
+    name = name.removesuffix(suffix)
+  return name
+
+
+def csv_files(paths):
+  files = []
+  for path in paths:
+    if os.path.isdir(path):
+      files.extend(sorted(glob.glob(path + "/*.csv")))
+    else:
+      files.append(path)
+  return [f for f in files if not f.endswith(".header.csv")]
+
+
+class RuntimeEstimator:
+  # metric is the result column of the running time, e.g. wallTime for a
+  # comparison with the elapsed time of running runs
+  def __init__(self, paths=(), metric="totalPartitionTime") -> None:
+    self.metric = metric
+    # key -> list of running times, None for runs that hit the time limit
+    self.times = {}
+    for csv_file in csv_files(paths):
+      with open(csv_file) as f:
+        for row in csv.DictReader(f):
+          try:
+            self._add(row)
+          except (KeyError, ValueError, TypeError):
+            # not a result file of this repository or an incomplete line
+            continue
+
+  def _add(self, row) -> None:
+    if row.get("failed", "no") != "no":
+      return
+    time = float(row[self.metric])
+    if row.get("timeout", "no") != "no" or time >= invalid:
+      time = None
+    self._insert(row["algorithm"], _graph_name(row["graph"]), int(row["k"]), int(row["num_threads"]), time)
+
+  def _insert(self, algorithm, graph, k, threads, time) -> None:
+    for key in [(algorithm, graph, k, threads), (algorithm, graph, k), (algorithm, graph), (graph,), (algorithm,), ()]:
+      self.times.setdefault(key, []).append(time)
+
+  # Adds the result row (see results.read_result_row) of a run completed during the execution
+  def record(self, row) -> None:
+    try:
+      self._add(row)
+    except (KeyError, ValueError, TypeError):
+      # e.g. a wrapper without the metric
+      pass
+
+  def __len__(self) -> int:
+    return len(self.times.get((), []))
+
+  # Returns the predicted running time in seconds, using the most specific
+  # matching observations. Runs that hit the time limit count with the time limit.
+  def estimate(self, run) -> float:
+    graph = _graph_name(run.instance)
+    for key in [(run.algorithm, graph, run.k, run.threads), (run.algorithm, graph, run.k), (run.algorithm, graph),
+                (graph,), (run.algorithm,), ()]:
+      if key in self.times:
+        return statistics.mean(run.timelimit if time is None else time for time in self.times[key])
+    return float(run.timelimit)
+
+
+  # Returns the q-quantile of the running times of comparable runs (same
+  # algorithm and graph), or None if fewer than min_samples were observed
+  def quantile(self, run, q, min_samples=5):
+    graph = _graph_name(run.instance)
+    for key in [(run.algorithm, graph, run.k, run.threads), (run.algorithm, graph, run.k), (run.algorithm, graph)]:
+      times = self.times.get(key, [])
+      if len(times) >= min_samples:
+        times = sorted(run.timelimit if time is None else time for time in times)
+        return times[max(math.ceil(q * len(times)) - 1, 0)]
+    return None
+
+
+def order_runs(runs, policy, estimator):
+  assert policy in policies, f"Unknown scheduling policy: {policy}"
+  if policy == "fifo":
+    return list(runs)
+  # sorting is stable, ties keep the workload order
+  return sorted(runs, key=estimator.estimate, reverse=(policy == "lpt"))
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+import time
+
+from experiments.procfs import clock_ticks, process_stats, process_tree
+
+# Samples the process tree of a run in regular intervals. Each sample is
+# written as one line "<elapsed ms> <rss KiB> <running threads> <cpu utilization>"
+# into <result file>.timeline, where the cpu utilization is the number of
+# cores busy with the run since the previous sample. A summary of the timeline
+# is appended to the result line.
+
+sampler_columns = ["avg_active_threads", "avg_cpu_utilization", "sampled_peak_rss_kb", "time_to_peak_rss"]
+
+
+def timeline_file(result_file):
+  return result_file.removesuffix(".results") + ".timeline"
+
+
+class TimelineSampler:
+  def __init__(self, pid, result_file) -> None:
+    self.pid = pid
+    self.start = time.monotonic()
+    self.last_time = self.start
+    self.last_ticks = {}
+    self.num_samples = 0
+    self.sum_threads = 0
+    self.sum_utilization = 0.0
+    self.peak_rss = 0
+    self.time_to_peak = 0.0
+    self.output = open(timeline_file(result_file), "w")
+
+  def sample(self) -> None:
+    now = time.monotonic()
+    rss = 0
+    threads = 0
+    ticks = {}
+    for pid in process_tree(self.pid):
+      stats = process_stats(pid)
+      if stats is not None:
+        ticks[pid], pid_rss, pid_threads = stats
+        rss += pid_rss
+        threads += pid_threads
+    # processes which started since the last sample count completely
+    busy_ticks = sum(max(t - self.last_ticks.get(pid, 0), 0) for pid, t in ticks.items())
+    utilization = busy_ticks / clock_ticks / max(now - self.last_time, 1e-6)
+    self.last_ticks = ticks
+    self.last_time = now
+
+    elapsed = now - self.start
+    self.num_samples += 1
+    self.sum_threads += threads
+    self.sum_utilization += utilization
+    if rss > self.peak_rss:
+      self.peak_rss = rss
+      self.time_to_peak = elapsed
+    self.output.write(f"{int(elapsed * 1000)} {rss} {threads} {utilization:.2f}\n")
+
+  def close(self):
+    self.output.close()
+    if self.num_samples == 0:
+      return {column: "" for column in sampler_columns}
+    return {
+      "avg_active_threads": round(self.sum_threads / self.num_samples, 2),
+      "avg_cpu_utilization": round(self.sum_utilization / self.num_samples, 2),
+      "sampled_peak_rss_kb": self.peak_rss,
+      "time_to_peak_rss": round(self.time_to_peak, 3),
+    }
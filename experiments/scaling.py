@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+import csv
+import math
+import os
+import os.path
+import statistics
+
+from experiments.runtime import invalid
+
+# Strong scaling report of an experiment with "scaling": true. For each
+# algorithm, instance and k, the mean running time (totalPartitionTime over
+# all seeds) with p threads is compared to the mean running time with one
+# thread:
+#
+#   scaling/<algorithm>.csv  graph,k,threads,time,speedup,efficiency
+#   scaling/summary.csv      algorithm,threads,instances,speedup,efficiency
+#
+# The summary contains the geometric means over all instances (graph and k)
+# for which both the baseline and the run with p threads completed.
+# Timeouts and failed runs are ignored.
+
+
+def _geometric_mean(values):
+  return math.exp(statistics.mean(math.log(value) for value in values))
+
+
+def read_times(result_csv):
+  # (graph, k) -> threads -> running times
+  times = {}
+  with open(result_csv) as f:
+    for row in csv.DictReader(f):
+      try:
+        if row["timeout"] != "no" or row["failed"] != "no":
+          continue
+        time = float(row["totalPartitionTime"])
+        if time >= invalid or time <= 0:
+          continue
+        times.setdefault((row["graph"], int(row["k"])), {}).setdefault(int(row["num_threads"]), []).append(time)
+      except (KeyError, ValueError, TypeError):
+        continue
+  return times
+
+
+# Returns the summary rows of one algorithm
+def write_scaling_table(scaling_dir, algorithm_file, result_csv):
+  summary = {}
+  with open(scaling_dir + "/" + algorithm_file + ".csv", "w") as f:
+    f.write("graph,k,threads,time,speedup,efficiency\n")
+    for (graph, k), by_threads in sorted(read_times(result_csv).items()):
+      baseline = statistics.mean(by_threads[1]) if 1 in by_threads else None
+      for threads, times in sorted(by_threads.items()):
+        time = statistics.mean(times)
+        speedup = ""
+        efficiency = ""
+        if baseline is not None:
+          speedup = baseline / time
+          efficiency = speedup / threads
+          summary.setdefault(threads, []).append(speedup)
+          speedup = f"{speedup:.3f}"
+          efficiency = f"{efficiency:.3f}"
+        f.write(f"{graph},{k},{threads},{time},{speedup},{efficiency}\n")
+  return [(threads, len(speedups), _geometric_mean(speedups), _geometric_mean(speedups) / threads)
+          for threads, speedups in sorted(summary.items())]
+
+
+def write_scaling_report(experiment_dir, algorithm_files):
+  scaling_dir = experiment_dir + "/scaling"
+  os.makedirs(scaling_dir, exist_ok=True)
+  with open(scaling_dir + "/summary.csv", "w") as summary:
+    summary.write("algorithm,threads,instances,speedup,efficiency\n")
+    print(f"{'algorithm':<20} {'threads':>7} {'instances':>9} {'speedup':>8} {'efficiency':>10}")
+    for algorithm_file in algorithm_files:
+      result_csv = experiment_dir + "/" + algorithm_file + ".csv"
+      if not os.path.exists(result_csv):
+        continue
+      for threads, instances, speedup, efficiency in write_scaling_table(scaling_dir, algorithm_file, result_csv):
+        summary.write(f"{algorithm_file},{threads},{instances},{speedup:.3f},{efficiency:.3f}\n")
+        print(f"{algorithm_file:<20} {threads:>7} {instances:>9} {speedup:>8.2f} {efficiency:>10.2f}")
+  return scaling_dir
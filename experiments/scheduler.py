@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+
+# Packs runs onto a fixed budget of cores. A serial run occupies one core,
+# a parallel run as many cores as it uses threads (at most the whole budget,
+# otherwise it could never be started).
+#
+# Optionally, runs are also admitted against a memory budget, using the peak
+# memory predicted by a MemoryEstimator. A run whose estimate exceeds the whole
+# budget is started once nothing else is running.
+
+
+class CoreScheduler:
+  def __init__(self, runs, cores: int, *, memory: int | None = None, estimator=None) -> None:
+    assert cores >= 1, "At least one core is required"
+    assert memory is None or estimator is not None, "A memory budget requires an estimator"
+    self.pending = list(runs)
+    self.cores = cores
+    self.free_cores = cores
+    self.memory = memory
+    self.free_memory = memory
+    self.estimator = estimator
+    self.reserved_memory = {}
+
+  def required_cores(self, run) -> int:
+    if not run.parallel:
+      return 1
+    return min(run.threads, self.cores)
+
+  # Adds a run to the end of the workload
+  def add(self, run) -> None:
+    self.pending.append(run)
+
+  def has_pending(self) -> bool:
+    return len(self.pending) > 0
+
+  def is_idle(self) -> bool:
+    return self.free_cores == self.cores
+
+  def _fits(self, run) -> bool:
+    if self.free_cores == 0 or self.required_cores(run) > self.free_cores:
+      return False
+    if self.memory is None:
+      return True
+    return self.estimator.estimate(run) <= self.free_memory or self.is_idle()
+
+  def _reserve(self, run) -> None:
+    self.free_cores -= self.required_cores(run)
+    if self.memory is not None:
+      self.reserved_memory[run.id] = self.estimator.estimate(run)
+      self.free_memory -= self.reserved_memory[run.id]
+
+  # Returns the runs that should be started now and reserves their resources.
+  # Runs are considered in workload order, but a run that does not fit
+  # does not block smaller runs behind it (first fit). Once all cores are
+  # used, the remaining runs are not looked at.
+  def poll(self):
+    if self.free_cores == 0:
+      return []
+    started = []
+    taken = []
+    for i, run in enumerate(self.pending):
+      if self.free_cores == 0:
+        break
+      if self._fits(run):
+        self._reserve(run)
+        started.append(run)
+        taken.append(i)
+    self._remove(taken)
+    return started
+
+  # Removes the runs at the given (ascending) positions without copying the pending list
+  def _remove(self, positions) -> None:
+    for i in reversed(positions):
+      del self.pending[i]
+
+  # peak_rss is the measured peak memory of the run in bytes (None if unknown)
+  def finish(self, run, peak_rss=None) -> None:
+    self.free_cores += self.required_cores(run)
+    assert self.free_cores <= self.cores
+    if self.memory is not None:
+      self.free_memory += self.reserved_memory.pop(run.id)
+    if self.estimator is not None and peak_rss is not None:
+      self.estimator.record(run, peak_rss)
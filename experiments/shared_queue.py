@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+import os
+import os.path
+import socket
+import threading
+
+from experiments.scheduler import CoreScheduler
+
+# Work queue on a shared file system, so that any number of executors on any
+# node which mounts the experiment directory can work on the same workload.
+#
+#  queue/claims/<run id>   created with O_EXCL by the executor that runs it
+#  queue/done/<run id>     created once the result of the run is written
+#  queue/workers/<worker>  heartbeat of an executor, touched periodically
+#
+# Exclusive creation and rename are atomic on NFS (v3 and newer), other than
+# appending to a common file. Claims of executors whose heartbeat is older
+# than the stale timeout (e.g. after a node crash) are taken over by others.
+
+heartbeat_interval = 60
+
+
+def _create_exclusive(path, content) -> bool:
+  try:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+  except FileExistsError:
+    return False
+  os.write(fd, content.encode())
+  os.fsync(fd)
+  os.close(fd)
+  return True
+
+
+class SharedQueue:
+  def __init__(self, queue_dir, stale_timeout=600) -> None:
+    self.claims_dir = queue_dir + "/claims"
+    self.done_dir = queue_dir + "/done"
+    self.workers_dir = queue_dir + "/workers"
+    for directory in [self.claims_dir, self.done_dir, self.workers_dir]:
+      os.makedirs(directory, exist_ok=True)
+    self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    self.heartbeat_file = self.workers_dir + "/" + self.worker_id
+    self.stale_timeout = stale_timeout
+    self.heartbeat()
+    self._stop_heartbeat = threading.Event()
+    self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+    self._heartbeat_thread.start()
+
+  def heartbeat(self) -> None:
+    with open(self.heartbeat_file, "w") as f:
+      f.write(self.worker_id + "\n")
+
+  def _heartbeat_loop(self) -> None:
+    while not self._stop_heartbeat.wait(heartbeat_interval):
+      self.heartbeat()
+
+  def close(self) -> None:
+    self._stop_heartbeat.set()
+    self._heartbeat_thread.join()
+    if os.path.exists(self.heartbeat_file):
+      os.remove(self.heartbeat_file)
+
+  def is_done(self, run) -> bool:
+    return os.path.exists(self.done_dir + "/" + run.id)
+
+  def _is_stale(self, claim_file) -> bool:
+    try:
+      with open(claim_file) as f:
+        owner = f.read().strip()
+      # compare file system timestamps only, the clocks of the nodes may differ
+      now = os.path.getmtime(self.heartbeat_file)
+      return now - os.path.getmtime(self.workers_dir + "/" + owner) > self.stale_timeout
+    except FileNotFoundError:
+      # the owner terminated without releasing the claim
+      return os.path.exists(claim_file)
+
+  # Returns whether this executor may run the given run
+  def claim(self, run) -> bool:
+    claim_file = self.claims_dir + "/" + run.id
+    if self.is_done(run):
+      return False
+    if _create_exclusive(claim_file, self.worker_id):
+      return True
+    if self._is_stale(claim_file):
+      # only one executor succeeds in moving the stale claim away
+      try:
+        os.rename(claim_file, claim_file + "." + self.worker_id + ".stale")
+      except FileNotFoundError:
+        return False
+      os.remove(claim_file + "." + self.worker_id + ".stale")
+      return _create_exclusive(claim_file, self.worker_id)
+    return False
+
+  def mark_done(self, run) -> None:
+    _create_exclusive(self.done_dir + "/" + run.id, self.worker_id)
+
+  # Gives a run back to the queue, e.g. if it was killed
+  def release(self, run) -> None:
+    claim_file = self.claims_dir + "/" + run.id
+    if os.path.exists(claim_file):
+      os.remove(claim_file)
+
+  def num_done(self) -> int:
+    return len(os.listdir(self.done_dir))
+
+
+# Scheduler which only starts runs that it could claim in the shared queue.
+# Runs which are claimed or completed by other executors are dropped.
+class SharedQueueScheduler(CoreScheduler):
+  def __init__(self, runs, cores: int, queue, **kwargs) -> None:
+    super().__init__([run for run in runs if not queue.is_done(run)], cores, **kwargs)
+    self.queue = queue
+
+  def add(self, run) -> None:
+    # e.g. a killed run, which is claimed by this executor
+    self.queue.release(run)
+    super().add(run)
+
+  def poll(self):
+    if self.free_cores == 0:
+      return []
+    started = []
+    # started runs and runs claimed by other executors
+    taken = []
+    for i, run in enumerate(self.pending):
+      if self.free_cores == 0:
+        break
+      if not self._fits(run):
+        continue
+      if self.queue.claim(run):
+        self._reserve(run)
+        started.append(run)
+      taken.append(i)
+    self._remove(taken)
+    return started
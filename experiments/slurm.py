@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+import heapq
+import math
+import os
+import os.path
+
+from experiments.workload import iter_workload
+
+# Packs the runs of a workload into bundles which fill one node for at most
+# the given walltime, and writes a Slurm job array with one task per bundle.
+# Each task executes its bundle with execute_experiments.py on all cores of
+# the node. The tasks share the experiment directory via the shared queue,
+# so a task that is resubmitted (or a second array) only repeats lost runs.
+
+
+def parse_walltime(walltime):
+  # [days-]hours:minutes:seconds
+  days, _, time = walltime.rpartition("-")
+  hours, minutes, seconds = [int(value) for value in time.split(":")]
+  return ((int(days) if days != "" else 0) * 24 + hours) * 3600 + minutes * 60 + seconds
+
+
+def format_walltime(seconds):
+  seconds = int(seconds)
+  return f"{seconds // 86400}-{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+# Makespan of a bundle of (id, cores, estimate) items on a node, simulating the
+# executor of an array task: longest estimate first (--policy lpt), started by
+# first fit whenever cores become free (see CoreScheduler.poll)
+def simulate_makespan(items, cores):
+  pending = sorted(items, key=lambda item: item[2], reverse=True)
+  running = []
+  now = 0.0
+  free = cores
+  while len(pending) > 0:
+    started = []
+    for i, (_, required, estimate) in enumerate(pending):
+      if free == 0:
+        break
+      if required <= free:
+        free -= required
+        heapq.heappush(running, (now + estimate, required))
+        started.append(i)
+    for i in reversed(started):
+      del pending[i]
+    if len(pending) > 0:
+      # the next completion frees cores
+      now, required = heapq.heappop(running)
+      free += required
+  return max([end for end, _ in running], default=now)
+
+
+# Packs (id, cores, estimate) items into bundles by first fit decreasing on
+# the estimate. Each bundle keeps the times at which its cores become free, a
+# run is placed on the cores which are free first. A bundle whose simulated
+# first-fit schedule still exceeds the walltime (e.g. due to fragmentation) is
+# split. A run which is longer than the walltime gets a bundle of its own.
+def pack_bundles(items, cores, walltime):
+  bundles = []
+  for item in sorted(items, key=lambda item: item[2], reverse=True):
+    _, required, estimate = item
+    if estimate > walltime:
+      bundles.append({"items": [item], "free_times": [math.inf] * cores})
+      continue
+    for bundle in bundles:
+      free_times = bundle["free_times"]
+      if free_times[required - 1] + estimate <= walltime:
+        break
+    else:
+      bundle = {"items": [], "free_times": [0.0] * cores}
+      bundles.append(bundle)
+    free_times = bundle["free_times"]
+    end = free_times[required - 1] + estimate
+    free_times[:required] = [end] * required
+    free_times.sort()
+    bundle["items"].append(item)
+
+  result = []
+  stack = [bundle["items"] for bundle in bundles]
+  while len(stack) > 0:
+    bundle_items = stack.pop()
+    makespan = simulate_makespan(bundle_items, cores)
+    if makespan > walltime and len(bundle_items) > 1:
+      # every other run, both halves keep a similar mix of long and short runs
+      stack.extend([bundle_items[0::2], bundle_items[1::2]])
+    else:
+      result.append({"ids": [item[0] for item in bundle_items], "makespan": makespan})
+  return result
+
+
+# Writes the bundles (see pack_bundles) by streaming the workload file
+def write_job_array(experiment_dir, experiment_file, workload_file, bundles, cores, walltime, *, partition=None, memory=None, history=()):
+  repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  slurm_dir = os.path.abspath(experiment_dir) + "/slurm"
+  os.makedirs(slurm_dir, exist_ok=True)
+  bundle_of = {run_id: i for i, bundle in enumerate(bundles) for run_id in bundle["ids"]}
+  # buffered per bundle, there may be more bundles than open files
+  buffers = [[] for _ in bundles]
+  for i in range(len(bundles)):
+    open(f"{slurm_dir}/bundle_{i}.txt", "w").close()
+
+  def flush(i):
+    with open(f"{slurm_dir}/bundle_{i}.txt", "a") as bundle_file:
+      bundle_file.write("".join(command + "\n" for command in buffers[i]))
+    buffers[i].clear()
+
+  for run in iter_workload(workload_file):
+    i = bundle_of[run.id]
+    buffers[i].append(run.command)
+    if len(buffers[i]) >= 1024:
+      flush(i)
+  for i in range(len(bundles)):
+    flush(i)
+
+  longest_bundle = max(bundle["makespan"] for bundle in bundles)
+  with open(f"{slurm_dir}/job_array.sh", "w") as script:
+    script.write("#!/bin/bash\n")
+    script.write(f"#SBATCH --job-name={os.path.basename(os.path.abspath(experiment_dir))}\n")
+    script.write(f"#SBATCH --array=0-{len(bundles) - 1}\n")
+    script.write("#SBATCH --nodes=1\n")
+    script.write("#SBATCH --ntasks=1\n")
+    script.write(f"#SBATCH --cpus-per-task={cores}\n")
+    # bundles longer than the walltime (a single run exceeding it) get more time
+    script.write(f"#SBATCH --time={format_walltime(max(walltime, longest_bundle))}\n")
+    script.write(f"#SBATCH --output={slurm_dir}/%A_%a.out\n")
+    if partition is not None:
+      script.write(f"#SBATCH --partition={partition}\n")
+    if memory is not None:
+      script.write(f"#SBATCH --mem={memory}\n")
+    script.write("\n")
+    script.write("# requires the environment of env.sh, which sbatch exports by default\n")
+    script.write(f"cd {os.path.abspath(os.path.dirname(os.path.abspath(experiment_dir)))}\n")
+    script.write(f"{repo_dir}/experiments/execute_experiments.py {os.path.abspath(experiment_file)}"
+                 f" -d {os.path.abspath(experiment_dir)} -j {cores} --shared-queue --policy lpt"
+                 f" --workload {slurm_dir}/bundle_${{SLURM_ARRAY_TASK_ID}}.txt"
+                 + "".join(f" --history {os.path.abspath(path)}" for path in history) + "\n")
+  return slurm_dir + "/job_array.sh"
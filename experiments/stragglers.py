@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+import os
+import socket
+import sys
+import threading
+import time
+
+from experiments.procfs import clock_ticks, kill_tree, process_stats, process_tree
+from experiments.results import read_result_row
+
+# Compares the elapsed time of each running run with the wall times (wallTime
+# column) of comparable runs (same algorithm, graph, k and threads, see
+# RuntimeEstimator), both from the history and completed during this execution. The state of all
+# running runs is written periodically to a status file:
+#   straggler  the run takes longer than the p99 of comparable runs
+#   hang       the run takes longer than kill_factor x p99 and used no cpu
+#              since the previous check
+#
+# If a kill factor is given, hanging runs are killed and queued again (once,
+# a run that hangs again is killed and repeated on resume). Slow runs that
+# still use their cores are left alone.
+
+idle_utilization = 0.05
+
+
+class StragglerMonitor:
+  def __init__(self, executor, estimator, status_file, *, interval=60, kill_factor=None, min_samples=5) -> None:
+    self.executor = executor
+    self.estimator = estimator
+    self.status_file = status_file
+    self.interval = interval
+    self.kill_factor = kill_factor
+    self.min_samples = min_samples
+    # run id -> (time, cpu ticks) of the previous check
+    self.ticks = {}
+    self.requeued = set()
+    self._stop = threading.Event()
+    self._thread = threading.Thread(target=self._loop, daemon=True)
+
+  def start(self) -> None:
+    self._thread.start()
+
+  def stop(self) -> None:
+    self._stop.set()
+    self._thread.join()
+    self.check()
+
+  def _loop(self) -> None:
+    while not self._stop.wait(self.interval):
+      self.check()
+
+  # Called by the executor for each finished run
+  def finished(self, run, info) -> None:
+    if not info["killed"]:
+      row = read_result_row(run.result_file, self.executor.columns)
+      if row is not None:
+        self.estimator.record(row)
+
+  def _cpu_ticks(self, pid):
+    ticks = 0
+    for child in process_tree(pid):
+      stats = process_stats(child)
+      if stats is not None:
+        ticks += stats[0]
+    return ticks
+
+  def check(self) -> None:
+    now = time.monotonic()
+    ticks = {}
+    lines = []
+    num_stragglers = 0
+    for pid, (run, _, info) in list(self.executor.running.items()):
+      elapsed = now - info["start"]
+      ticks[run.id] = (now, self._cpu_ticks(pid))
+      utilization = None
+      if run.id in self.ticks:
+        previous_time, previous_ticks = self.ticks[run.id]
+        # processes of the run that terminated in the meantime are missing
+        utilization = max(ticks[run.id][1] - previous_ticks, 0) / clock_ticks / (now - previous_time)
+
+      p99 = self.estimator.quantile(run, 0.99, self.min_samples)
+      state = "running"
+      if p99 is not None and elapsed > p99:
+        state = "straggler"
+        if (self.kill_factor is not None and elapsed > self.kill_factor * p99
+            and utilization is not None and utilization < idle_utilization):
+          state = "hang"
+          if not info["killed"] and run.id not in self.requeued:
+            self.requeued.add(run.id)
+            info["requeue"] = True
+            info["killed"] = True
+            kill_tree(pid)
+            state = "requeued"
+      if state != "running":
+        num_stragglers += 1
+      lines.append(f"  {run.id}  {state:<9}  {elapsed:>9.1f}  {'-' if p99 is None else f'{p99:.1f}':>9}"
+                   f"  {'-' if utilization is None else f'{utilization:.2f}':>5}  {run!r}")
+    self.ticks = ticks
+
+    # unique name, several executors may share the experiment directory
+    tmp_file = f"{self.status_file}.{socket.gethostname()}.{os.getpid()}.tmp"
+    try:
+      with open(tmp_file, "w") as f:
+        f.write(f"# {time.strftime('%Y-%m-%d %H:%M:%S')}: {len(lines)} running, {num_stragglers} stragglers\n")
+        f.write(f"# {'run id':<16}  {'state':<9}  {'elapsed':>9}  {'p99':>9}  {'cpu':>5}  run\n")
+        for line in sorted(lines, key=lambda line: line.split()[1] == "running"):
+          f.write(line + "\n")
+      os.replace(tmp_file, self.status_file)
+    except OSError as e:
+      # the status is informational, it must not abort the experiment
+      print(f"Warning: status file not written ({e})", file=sys.stderr)
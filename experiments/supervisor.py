@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+import asyncio
+import heapq
+import os
+import os.path
+import signal
+import subprocess
+import time
+
+from experiments.executor import LocalExecutor, rusage_info
+from experiments.procfs import kill_tree
+from experiments.sampler import TimelineSampler, sampler_columns, timeline_file
+from experiments.topology import numactl_prefix
+
+# Supervises all running runs from a single asyncio event loop:
+#  - the wrapper scripts are executed directly (without shell) and their output
+#    is streamed line by line into the result file
+#  - process exits are detected via pidfds and reaped with os.wait4, so the
+#    resource usage of each run is available
+#  - deadlines of all runs are kept in one heap and enforced by one timer task
+#
+# The supervisor owns the time limit of its runs: the wrappers are started with
+# SUPERVISED_TIMELIMIT=1 and then start no timer thread (see
+# scripts/timelimit.py). The time limit counts from the start of the wrapper,
+# i.e. includes its startup. At the time limit, the processes below the wrapper
+# receive SIGTERM (so that the wrapper reports a timeout). If they are still
+# alive after the grace period (e.g. hanging MPI runs), they receive SIGKILL
+# and the wrapper itself is killed after the kill delay.
+#
+# Optionally, the process tree of each run is sampled from /proc every
+# sample_interval milliseconds (see sampler.py).
+
+kill_delay = 10
+escalation = [(signal.SIGTERM, False), (signal.SIGKILL, False), (signal.SIGKILL, True)]
+
+
+class AsyncExecutor(LocalExecutor):
+  def __init__(self, scheduler, on_finish=None, *, grace=60, sample_interval=None, **kwargs) -> None:
+    super().__init__(scheduler, on_finish, **kwargs)
+    self.grace = grace
+    self.env = dict(os.environ, SUPERVISED_TIMELIMIT="1")
+    self.sample_interval = sample_interval
+    if sample_interval is not None:
+      self.columns.extend(sampler_columns)
+    # (deadline, pid, run id, escalation level)
+    self.deadlines = []
+
+  def execute(self) -> None:
+    asyncio.run(self._execute())
+
+  async def _execute(self) -> None:
+    self.loop = asyncio.get_running_loop()
+    self.done = asyncio.Queue()
+    self.deadline_changed = asyncio.Event()
+    tasks = [asyncio.create_task(self._watchdog())]
+    if self.sample_interval is not None:
+      tasks.append(asyncio.create_task(self._sample()))
+    try:
+      while self.has_work():
+        if self.launch_pending():
+          self.finished(*(await self.done.get()))
+    finally:
+      for task in tasks:
+        task.cancel()
+
+  def launch(self, run) -> None:
+    info = self.prepare(run)
+    argv = list(info["argv"])
+    preexec_fn = None
+    if self.allocator is not None:
+      preexec_fn = lambda: os.sched_setaffinity(0, info["cpus"])
+      if self.numa_policy is not None:
+        argv = numactl_prefix(self.numa_policy, info["nodes"]).split() + argv
+    proc = subprocess.Popen(argv, stdout=subprocess.PIPE, start_new_session=True, preexec_fn=preexec_fn,
+                            env=self.env)
+    info["output"] = open(run.result_file, "a")
+    info["buffer"] = b""
+    info["first_line"] = True
+    info["pidfd"] = os.pidfd_open(proc.pid)
+    os.set_blocking(proc.stdout.fileno(), False)
+    self.loop.add_reader(proc.stdout.fileno(), self._read, proc.pid)
+    self.loop.add_reader(info["pidfd"], self._reap, proc.pid)
+    if self.sample_interval is not None:
+      info["sampler"] = TimelineSampler(proc.pid, run.result_file)
+    self.running[proc.pid] = (run, proc, info)
+
+    heapq.heappush(self.deadlines, (time.monotonic() + run.timelimit, proc.pid, run.id, 0))
+    self.deadline_changed.set()
+
+  def _write_lines(self, run, info, data, final=False) -> None:
+    lines = (info["buffer"] + data).split(b"\n")
+    info["buffer"] = lines.pop() if not final else b""
+    if final and lines[-1] == b"":
+      lines.pop()
+    for line in lines:
+      line = line.decode(errors="replace")
+      # same as the shell snippet used for tagged instances
+      if info["first_line"] and run.tag is not None:
+        line = f"{run.tag},{line}"
+      info["first_line"] = False
+      info["output"].write(line + "\n")
+
+  def _read(self, pid) -> None:
+    run, proc, info = self.running[pid]
+    try:
+      data = os.read(proc.stdout.fileno(), 65536)
+    except BlockingIOError:
+      return
+    if data == b"":
+      self.loop.remove_reader(proc.stdout.fileno())
+    else:
+      self._write_lines(run, info, data)
+
+  def _reap(self, pid) -> None:
+    run, proc, info = self.running.pop(pid)
+    self.loop.remove_reader(info["pidfd"])
+    os.close(info["pidfd"])
+    _, status, rusage = os.wait4(pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    info["peak_rss"] = rusage.ru_maxrss * 1024
+    info.update(rusage_info(rusage))
+    if "sampler" in info:
+      info.update(info["sampler"].close())
+      if info["killed"]:
+        os.remove(timeline_file(run.result_file))
+
+    # drain what is left in the pipe
+    fd = proc.stdout.fileno()
+    self.loop.remove_reader(fd)
+    remaining = b""
+    try:
+      while True:
+        data = os.read(fd, 65536)
+        if data == b"":
+          break
+        remaining += data
+    except BlockingIOError:
+      pass
+    self._write_lines(run, info, remaining, final=True)
+    if run.tag is not None and info["first_line"]:
+      # the shell snippet also prints the tag for empty output
+      info["output"].write(f"{run.tag},\n")
+    info["output"].close()
+    proc.stdout.close()
+
+    self.complete(run, info)
+    self.done.put_nowait((run, proc.returncode, info))
+
+  async def _watchdog(self) -> None:
+    while True:
+      self.deadline_changed.clear()
+      timeout = None
+      if len(self.deadlines) > 0:
+        timeout = max(self.deadlines[0][0] - time.monotonic(), 0)
+      try:
+        await asyncio.wait_for(self.deadline_changed.wait(), timeout)
+        continue
+      except asyncio.TimeoutError:
+        pass
+
+      now = time.monotonic()
+      while len(self.deadlines) > 0 and self.deadlines[0][0] <= now:
+        _, pid, run_id, level = heapq.heappop(self.deadlines)
+        if pid not in self.running or self.running[pid][0].id != run_id:
+          # already finished
+          continue
+        sig, include_root = escalation[level]
+        kill_tree(pid, sig, include_root=include_root)
+        if level + 1 < len(escalation):
+          delay = self.grace if level == 0 else kill_delay
+          heapq.heappush(self.deadlines, (now + delay, pid, run_id, level + 1))
+
+  async def _sample(self) -> None:
+    while True:
+      await asyncio.sleep(self.sample_interval / 1000)
+      for run, proc, info in self.running.values():
+        info["sampler"].sample()
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+import os
+import os.path
+import re
+
+# Machine topology as exposed by the kernel in /sys. Each run gets a
+# disjoint set of cores, preferably within a single NUMA node so that
+# threads and memory of a run stay on one socket.
+
+cpu_sysfs = "/sys/devices/system/cpu"
+node_sysfs = "/sys/devices/system/node"
+
+
+def parse_cpulist(cpulist):
+  cpus = []
+  for part in cpulist.strip().split(","):
+    if part == "":
+      continue
+    first, _, last = part.partition("-")
+    cpus.extend(range(int(first), int(last if last != "" else first) + 1))
+  return cpus
+
+
+def format_cpulist(cpus, sep=","):
+  ranges = []
+  for cpu in sorted(cpus):
+    if len(ranges) > 0 and ranges[-1][1] == cpu - 1:
+      ranges[-1][1] = cpu
+    else:
+      ranges.append([cpu, cpu])
+  return sep.join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+def _read(path):
+  with open(path) as f:
+    return f.read().strip()
+
+
+def _core_key(cpu):
+  # Hyperthreads of the same core share the lowest cpu of their sibling list.
+  # Sorting by (sibling index, core) uses one hyperthread of every core first.
+  siblings_file = f"{cpu_sysfs}/cpu{cpu}/topology/thread_siblings_list"
+  if not os.path.exists(siblings_file):
+    return (0, cpu)
+  siblings = parse_cpulist(_read(siblings_file))
+  return (siblings.index(cpu) if cpu in siblings else 0, min(siblings + [cpu]))
+
+
+# Returns a dict NUMA node -> cpus which the executor is allowed to use
+def read_topology():
+  allowed = os.sched_getaffinity(0)
+  nodes = {}
+  if os.path.isdir(node_sysfs):
+    for entry in os.listdir(node_sysfs):
+      match = re.fullmatch(r"node(\d+)", entry)
+      if match is not None:
+        cpus = [cpu for cpu in parse_cpulist(_read(f"{node_sysfs}/{entry}/cpulist")) if cpu in allowed]
+        if len(cpus) > 0:
+          nodes[int(match.group(1))] = cpus
+  if len(nodes) == 0:
+    nodes[0] = sorted(allowed)
+  return {node: sorted(cpus, key=_core_key) for node, cpus in sorted(nodes.items())}
+
+
+class CpuAllocator:
+  def __init__(self, topology) -> None:
+    self.topology = topology
+    self.free = {node: list(cpus) for node, cpus in topology.items()}
+
+  def num_cpus(self) -> int:
+    return sum(len(cpus) for cpus in self.free.values())
+
+  # Returns (cpus, numa nodes) for the requested number of cores.
+  # A run that fits into one node gets the node with the fewest free cores
+  # that still suffices (best fit), larger runs are spread over the nodes with
+  # the most free cores.
+  def allocate(self, count):
+    fitting = [node for node, cpus in self.free.items() if len(cpus) >= count]
+    if len(fitting) > 0:
+      node = min(fitting, key=lambda n: (len(self.free[n]), n))
+      cpus = self.free[node][:count]
+      self.free[node] = self.free[node][count:]
+      return cpus, [node]
+
+    assert self.num_cpus() >= count, "Not enough free cores"
+    cpus = []
+    nodes = []
+    for node in sorted(self.free, key=lambda n: (-len(self.free[n]), n)):
+      taken = self.free[node][:count - len(cpus)]
+      if len(taken) > 0:
+        self.free[node] = self.free[node][len(taken):]
+        cpus.extend(taken)
+        nodes.append(node)
+      if len(cpus) == count:
+        break
+    return cpus, sorted(nodes)
+
+  def release(self, cpus) -> None:
+    for node, node_cpus in self.topology.items():
+      returned = [cpu for cpu in cpus if cpu in node_cpus]
+      if len(returned) > 0:
+        self.free[node] = sorted(self.free[node] + returned, key=lambda cpu: node_cpus.index(cpu))
+
+
+def numactl_prefix(policy, nodes):
+  nodes = ",".join(str(node) for node in nodes)
+  if policy == "local":
+    return f"numactl --membind={nodes} "
+  elif policy == "interleave":
+    return f"numactl --interleave={nodes} "
+  assert False, f"Unknown memory policy: {policy}"
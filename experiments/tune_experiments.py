@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+import json
+import argparse
+import datetime
+import os
+import os.path
+import re
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from experiments.executor import LocalExecutor
+from experiments.grid import expand_configs
+from experiments.journal import Journal
+from experiments.racing import Racing, pareto_fronts
+from experiments.results import write_result_csv
+from experiments.scheduler import CoreScheduler
+from experiments.workload import read_workload
+
+# Tunes the variants of a parameter grid (e.g. Mt-KaHyPar options, see grid.py)
+# by racing instead of executing the complete workload (see racing.py). Set up
+# the experiment with setup_experiments.py as usual and add a "tuning" section
+# to experiment.json. The report is written to <experiment-folder>/tuning:
+#
+#   rounds.csv    round,instances,variants,survivors,cpu_hours (spent until the end of the round)
+#   variants.csv  algorithm,<grid parameters>,status,round,<objective>_ratio,time_ratio,pareto
+#
+# The ratios are geometric mean ratios to the best variant on the instances of
+# the last round in which the variant was evaluated. The completed runs are
+# recorded in journal.txt, so an interrupted tuning resumes where it stopped.
+
+parser = argparse.ArgumentParser()
+parser.add_argument("experiment", type=str)
+parser.add_argument("-j", "--cores", type=int, default=1,
+                    help="number of cores that runs are packed onto (parallel runs reserve one core per thread)")
+parser.add_argument("-d", "--directory", type=str, default=None,
+                    help="experiment directory (default: the directory created by setup_experiments.py today)")
+parser.add_argument("--workload", type=str, default=None,
+                    help="race the runs of this file instead of the workload of the experiment directory")
+
+args = parser.parse_args()
+
+with open(args.experiment) as json_experiment:
+  config = json.load(json_experiment)
+if "tuning" not in config:
+  parser.error(f'{args.experiment} has no "tuning" section')
+
+now = datetime.datetime.now()
+experiment_dir = str(now.year) + "-" + str(now.month) + "-" + str(now.day) + "_" + config["name"]
+if args.directory is not None:
+  experiment_dir = args.directory.rstrip("/")
+workload_file = args.workload
+if workload_file is None:
+  workload_file = experiment_dir + "/workload.jsonl"
+  if not os.path.exists(workload_file):
+    workload_file = experiment_dir + "/workload.txt"
+
+runs = read_workload(workload_file)
+journal = Journal(experiment_dir + "/journal.txt")
+# the columns appended by the executor, also for runs completed by an earlier execution
+columns = LocalExecutor(CoreScheduler([], args.cores)).columns
+racing = Racing(config["tuning"], runs, config["objective"], columns)
+for run in runs:
+  if journal.is_completed(run):
+    racing.record(run)
+
+interrupted = False
+executor = None
+
+def terminate(signum, frame):
+  global interrupted
+  interrupted = True
+  if executor is not None:
+    executor.stop(kill=True)
+signal.signal(signal.SIGTERM, terminate)
+signal.signal(signal.SIGINT, terminate)
+
+def run_finished(run, returncode):
+  journal.record(run)
+  racing.record(run)
+  if racing.budget_exhausted() and not executor.stopping:
+    # the running runs are finished, their results are used
+    executor.stop(kill=False)
+
+rounds = []
+survivors = list(racing.variants)
+round = 0
+while True:
+  pending = [run for run in racing.round_runs(round, survivors) if not journal.is_completed(run)]
+  if len(pending) > 0 and not racing.budget_exhausted():
+    print(f"Round {round}: {len(survivors)} variants on {racing.num_instances(round)} instances, {len(pending)} runs")
+    executor = LocalExecutor(CoreScheduler(pending, args.cores), on_finish=run_finished)
+    executor.execute()
+  if interrupted:
+    print("Tuning interrupted, call again to resume")
+    journal.close()
+    exit(1)
+  num_instances = len(racing.complete_instances(round, survivors))
+  if racing.budget_exhausted() or len(survivors) == 1 or racing.is_last_round(round):
+    rounds.append((round, num_instances, len(survivors), len(survivors), racing.cpu_seconds))
+    break
+  survivors_before = len(survivors)
+  survivors = racing.eliminate(round, survivors)
+  rounds.append((round, num_instances, survivors_before, len(survivors), racing.cpu_seconds))
+  round += 1
+journal.close()
+
+if racing.budget_exhausted():
+  print(f"Budget of {config['tuning']['budget']} cpu hours exhausted")
+
+# Report
+tuning_dir = experiment_dir + "/tuning"
+os.makedirs(tuning_dir, exist_ok=True)
+with open(tuning_dir + "/rounds.csv", "w") as f:
+  f.write("round,instances,variants,survivors,cpu_hours\n")
+  for round_index, num_instances, num_variants, num_survivors, cpu_seconds in rounds:
+    f.write(f"{round_index},{num_instances},{num_variants},{num_survivors},{cpu_seconds / 3600:.3f}\n")
+
+parameters = {partitioner_config.get("name", partitioner_config["partitioner"]): variant_columns
+              for partitioner_config, variant_columns in expand_configs(config["config"])}
+parameter_columns = list(dict.fromkeys(column for variant_columns in parameters.values() for column in variant_columns))
+final_instances = racing.complete_instances(round, survivors)
+final_scores = racing.scores(survivors, final_instances)
+pareto = set(pareto_fronts(final_scores)[0]) if len(final_scores) > 0 else set()
+with open(tuning_dir + "/variants.csv", "w") as f:
+  f.write(",".join(["algorithm"] + parameter_columns + ["status", "round", f"{config['objective']}_ratio", "time_ratio", "pareto"]) + "\n")
+  for variant in racing.variants:
+    if variant in racing.eliminated:
+      eliminated_in = racing.eliminated[variant]
+      same_round = [other for other in racing.variants if racing.eliminated.get(other, round + 1) >= eliminated_in]
+      scores = racing.scores(same_round, racing.complete_instances(eliminated_in, same_round))[variant]
+      status, last_round = "eliminated", eliminated_in
+    else:
+      scores = final_scores[variant]
+      status, last_round = "survivor", round
+    values = [parameters.get(variant, {}).get(column, "") for column in parameter_columns]
+    f.write(",".join([variant] + values + [status, str(last_round), f"{scores[0]:.4f}", f"{scores[1]:.4f}",
+                                           "yes" if variant in pareto else "no"]) + "\n")
+
+print(f"Pareto-best variants after {round + 1} rounds ({len(final_instances)} instances, {racing.cpu_seconds / 3600:.2f} cpu hours):")
+print(f"  {config['objective'] + '_ratio':>10} {'time_ratio':>10}  algorithm")
+for variant in sorted(pareto, key=lambda variant: final_scores[variant]):
+  print(f"  {final_scores[variant][0]:>10.4f} {final_scores[variant][1]:>10.4f}  {variant}")
+
+for partitioner_config, variant_parameters in expand_configs(config["config"]):
+  algorithm_name = partitioner_config.get("name", partitioner_config["partitioner"])
+  algorithm_name = '_'.join(list(map(lambda x: x.lower(), re.split(' |-', algorithm_name))))
+  write_result_csv(experiment_dir, algorithm_name, columns, variant_parameters)
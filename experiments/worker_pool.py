@@ -0,0 +1,217 @@
+#!/usr/bin/python3
+import importlib
+import multiprocessing.connection
+import os
+import os.path
+import resource
+import runpy
+import signal
+import subprocess
+import sys
+import tempfile
+import traceback
+
+from experiments.executor import LocalExecutor, rusage_columns
+
+# Executes the wrapper scripts inside long-lived worker processes. Instead of
+# starting a shell and a python interpreter per run, a worker runs the script
+# via runpy with the arguments of the workload line and redirects its output
+# to the result file (prepending the tag, like the shell snippet of tagged runs).
+#
+# The workers are started up front as fresh interpreters (python3 -m
+# experiments.worker_pool), so they never inherit the threads of the executor
+# (monitor, prefetching, heartbeat). Each worker imports the modules used by
+# the wrapper scripts once; the modules of the script folder stay loaded
+# between its runs, only the script itself is executed per run.
+
+_preload = ["argparse", "glob", "math", "ntpath", "re", "shlex", "shutil", "subprocess", "threading", "time",
+            "output_parser", "timelimit", "instance_index", "mt_kahypar_common"]
+
+
+def _run_script(argv, result_file, tag, cpus):
+  script = argv[0]
+  script_folder = os.path.dirname(os.path.abspath(script))
+  if script_folder not in sys.path:
+    sys.path.insert(0, script_folder)
+  cwd = os.getcwd()
+  all_cpus = os.sched_getaffinity(0)
+  if cpus is not None:
+    os.sched_setaffinity(0, cpus)
+
+  returncode = 0
+  with tempfile.TemporaryFile(mode="w+") as output:
+    sys.stdout.flush()
+    stdout_fd = os.dup(1)
+    os.dup2(output.fileno(), 1)
+    sys.argv = list(argv)
+    try:
+      runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+      returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+      traceback.print_exc()
+      returncode = 1
+    finally:
+      sys.stdout.flush()
+      os.dup2(stdout_fd, 1)
+      os.close(stdout_fd)
+
+      # undo the global state that a wrapper script may have changed
+      os.chdir(cwd)
+      os.sched_setaffinity(0, all_cpus)
+      signal.signal(signal.SIGTERM, signal.SIG_DFL)
+      signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    output.seek(0)
+    content = output.read()
+  with open(result_file, "a") as results:
+    if tag is not None:
+      results.write(f"{tag},{content.rstrip(chr(10))}\n")
+    else:
+      results.write(content)
+  return returncode
+
+
+def _worker_main(conn):
+  # interrupts are handled by the executor, don't inherit its handlers
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  signal.signal(signal.SIGTERM, signal.SIG_DFL)
+  while True:
+    try:
+      task = conn.recv()
+    except EOFError:
+      return
+    if task is None:
+      return
+    argv, result_file, tag, cpus = task
+    before = _rusage()
+    returncode = _run_script(argv, result_file, tag, cpus)
+    after = _rusage()
+    conn.send((returncode, _rusage_delta(before, after)))
+
+
+def _rusage():
+  return resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+
+
+# Resource usage of one run: the wrapper runs inside the worker, the partitioner
+# is a child of the worker. Except for the peak memory, all values are sums and
+# can be attributed to the run by their difference.
+def _rusage_delta(before, after):
+  usage = {
+    "user_time": 0.0,
+    "sys_time": 0.0,
+    "vol_ctx_switches": 0,
+    "invol_ctx_switches": 0,
+    "major_page_faults": 0,
+  }
+  for (start, end) in zip(before, after):
+    usage["user_time"] += end.ru_utime - start.ru_utime
+    usage["sys_time"] += end.ru_stime - start.ru_stime
+    usage["vol_ctx_switches"] += end.ru_nvcsw - start.ru_nvcsw
+    usage["invol_ctx_switches"] += end.ru_nivcsw - start.ru_nivcsw
+    usage["major_page_faults"] += end.ru_majflt - start.ru_majflt
+  usage["user_time"] = round(usage["user_time"], 3)
+  usage["sys_time"] = round(usage["sys_time"], 3)
+  # the peak of all children of a worker is only attributable if it grew during this run
+  peak_before, peak_after = before[1].ru_maxrss, after[1].ru_maxrss
+  usage["max_rss_kb"] = peak_after if peak_after > peak_before else ""
+  return usage
+
+
+class Worker:
+  def __init__(self, process, conn) -> None:
+    self.process = process
+    self.conn = conn
+
+  def submit(self, run, argv, cpus) -> None:
+    self.conn.send((argv, run.result_file, run.tag, cpus))
+
+  def shutdown(self) -> None:
+    try:
+      self.conn.send(None)
+    except (BrokenPipeError, OSError):
+      pass
+    self.process.wait()
+
+
+# Starts the given number of workers, which connect to the listener
+def _start_workers(listener, authkey, count):
+  repo_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  env = dict(os.environ, WORKER_POOL_AUTHKEY=authkey.hex(),
+             PYTHONPATH=os.pathsep.join([repo_folder] + [p for p in [os.environ.get("PYTHONPATH")] if p]))
+  processes = {}
+  for _ in range(count):
+    process = subprocess.Popen([sys.executable, "-m", "experiments.worker_pool", listener.address], env=env)
+    processes[process.pid] = process
+  workers = []
+  for _ in range(count):
+    conn = listener.accept()
+    workers.append(Worker(processes.pop(conn.recv()), conn))
+  return workers
+
+
+class PoolExecutor(LocalExecutor):
+  def __init__(self, scheduler, on_finish=None, *, workers, numa_policy=None, **kwargs) -> None:
+    assert numa_policy is None, "NUMA memory policies are not supported by the worker pool"
+    super().__init__(scheduler, on_finish, **kwargs)
+    self.socket_dir = tempfile.TemporaryDirectory(prefix="worker_pool.")
+    self.authkey = os.urandom(32)
+    self.listener = multiprocessing.connection.Listener(self.socket_dir.name + "/socket", "AF_UNIX", authkey=self.authkey)
+    self.num_workers = workers
+    self.workers = _start_workers(self.listener, self.authkey, workers)
+    self.idle = list(self.workers)
+
+  def launch(self, run) -> None:
+    if len(self.idle) == 0:
+      # replaces a worker that died
+      assert len(self.workers) < self.num_workers, "More concurrent runs than workers"
+      worker = _start_workers(self.listener, self.authkey, 1)[0]
+      self.workers.append(worker)
+    else:
+      worker = self.idle.pop()
+    info = self.prepare(run)
+    worker.submit(run, info["argv"], info.get("cpus"))
+    self.running[worker.process.pid] = (run, worker, info)
+
+  def wait_any(self):
+    conns = {worker.conn: pid for pid, (run, worker, info) in self.running.items()}
+    conn = multiprocessing.connection.wait(list(conns))[0]
+    run, worker, info = self.running.pop(conns[conn])
+    try:
+      returncode, usage = conn.recv()
+      info.update(usage)
+      info["peak_rss"] = usage["max_rss_kb"] * 1024 if usage["max_rss_kb"] != "" else None
+      self.idle.append(worker)
+    except EOFError:
+      # the worker died (or was killed by stop()), it is replaced on demand
+      worker.process.wait()
+      self.workers.remove(worker)
+      returncode = worker.process.returncode
+      info.update({column: "" for column in rusage_columns})
+    self.complete(run, info)
+    return run, returncode, info
+
+  def execute(self) -> None:
+    try:
+      super().execute()
+    finally:
+      for worker in self.workers:
+        worker.shutdown()
+      self.listener.close()
+      self.socket_dir.cleanup()
+
+
+if __name__ == "__main__":
+  # a worker, started by PoolExecutor with the address of its listener
+  script_folder = os.environ.get("PARTITIONER_SCRIPT_FOLDER")
+  if script_folder is not None:
+    sys.path.append(script_folder)
+  for module in _preload:
+    try:
+      importlib.import_module(module)
+    except ImportError:
+      pass
+  conn = multiprocessing.connection.Client(sys.argv[1], "AF_UNIX", authkey=bytes.fromhex(os.environ["WORKER_POOL_AUTHKEY"]))
+  conn.send(os.getpid())
+  _worker_main(conn)
@@ -0,0 +1,213 @@
+#!/usr/bin/python3
+import hashlib
+import json
+import ntpath
+import os.path
+import re
+import shlex
+
+from experiments.partitioner_mapping import partitioner_mapping
+
+# A workload line as generated by setup_experiments.py has the form
+#   <script>.py <positional args> [options] [| { line=$(cat); echo "<tag>,$line"; }] >> <result file>
+# The executor needs to know what a line does (e.g. the number of threads) without
+# running it, so we parse the line back into its components here.
+#
+# setup_experiments.py also writes the runs as JSON lines (workload.jsonl),
+# which can be read without parsing shell syntax:
+#   {"id": ..., "partitioner": ..., "name": ..., "instance": ..., "threads": ..., "k": ...,
+#    "epsilon": ..., "seed": ..., "objective": ..., "timelimit": ..., "args": ..., "config_file": ...,
+#    "tag": ..., "resources": {"cores": ..., "memory": ...}, "result_file": ..., "argv": [...], "command": ...}
+# The id is the same as for the equivalent line of workload.txt.
+
+_tag_snippet = re.compile(r' \| \{ line=\$\(cat\); echo "(.*),\$line"; \}$')
+_script_to_partitioner = {p.script: name for name, p in partitioner_mapping.items()}
+
+
+class Run:
+  def __init__(
+    self,
+    command: str,
+    *,
+    argv: list,
+    partitioner: str,
+    instance: str,
+    threads: int,
+    k: int,
+    epsilon: float,
+    seed: int,
+    objective: str,
+    timelimit: int,
+    result_file: str,
+    name: str = "",
+    args: str | None = None,
+    config_file: str = "",
+    tag: str | None = None,
+  ) -> None:
+    self.command = command
+    self.argv = argv
+    self.partitioner = partitioner
+    self.instance = instance
+    self.threads = threads
+    self.k = k
+    self.epsilon = epsilon
+    self.seed = seed
+    self.objective = objective
+    self.timelimit = timelimit
+    self.result_file = result_file
+    self.name = name
+    self.args = args
+    self.config_file = config_file
+    self.tag = tag
+
+  # Stable identifier of the run, independent of its position in the workload
+  @property
+  def id(self) -> str:
+    return hashlib.sha1(self.command.encode()).hexdigest()[:16]
+
+  @property
+  def parallel(self) -> bool:
+    return partitioner_mapping[self.partitioner].parallel
+
+  @property
+  def algorithm(self) -> str:
+    return self.name if self.name != "" else self.partitioner
+
+  # argv and command of the run, with the instance read from another path
+  def call_with_instance(self, instance):
+    argv = [instance if arg == self.instance else arg for arg in self.argv]
+    return argv, self.command.replace(self.instance, instance, 1)
+
+  # The same run with another seed
+  def with_seed(self, seed):
+    call, _, result_file = self.command.rpartition(" >> ")
+    # the positional arguments are plain words (see setup_experiments.py)
+    seed_index = 5 if self.parallel else 4
+    words = call.split(" ", seed_index + 1)
+    assert int(words[seed_index]) == self.seed
+    words[seed_index] = str(seed)
+    # the header is written by the first run of the workload
+    call = re.sub(r" --header '[^']*'( --tag)?", "", " ".join(words))
+    result_file = result_file.removesuffix(f".{self.seed}.results") + f".{seed}.results"
+    return parse_workload_line(call + " >> " + result_file)
+
+  def __repr__(self) -> str:
+    return f"Run({self.algorithm}, {ntpath.basename(self.instance)}, t={self.threads}, k={self.k}, seed={self.seed})"
+
+
+def parse_workload_line(line):
+  command = line.strip()
+  call, sep, result_file = command.rpartition(" >> ")
+  assert sep != "", f"Workload line without result file: {command}"
+
+  tag = None
+  tag_match = _tag_snippet.search(call)
+  if tag_match is not None:
+    tag = tag_match.group(1)
+    call = call[:tag_match.start()]
+
+  argv = shlex.split(call)
+  script = ntpath.basename(argv[0]).removesuffix(".py")
+  assert script in _script_to_partitioner, f"Unknown partitioner script: {argv[0]}"
+  partitioner = _script_to_partitioner[script]
+
+  positional = []
+  options = {}
+  i = 1
+  while i < len(argv):
+    arg = argv[i]
+    if arg.startswith("--"):
+      key, eq, value = arg[2:].partition("=")
+      if eq == "" and key != "tag":
+        i += 1
+        value = argv[i]
+      options[key] = value
+    else:
+      positional.append(arg)
+    i += 1
+
+  if partitioner_mapping[partitioner].parallel:
+    instance, threads, k, epsilon, seed, objective, timelimit = positional
+  else:
+    instance, k, epsilon, seed, objective, timelimit = positional
+    threads = 1
+  return Run(command,
+             argv=argv,
+             partitioner=partitioner,
+             instance=instance,
+             threads=int(threads),
+             k=int(k),
+             epsilon=float(epsilon),
+             seed=int(seed),
+             objective=objective,
+             timelimit=int(timelimit),
+             result_file=os.path.abspath(result_file.strip()),
+             name=options.get("name", ""),
+             args=options.get("args"),
+             config_file=options.get("config", ""),
+             tag=tag)
+
+
+def run_to_json(run, resources=None):
+  record = {
+    "id": run.id,
+    "partitioner": run.partitioner,
+    "name": run.name,
+    "instance": run.instance,
+    "threads": run.threads,
+    "k": run.k,
+    "epsilon": run.epsilon,
+    "seed": run.seed,
+    "objective": run.objective,
+    "timelimit": run.timelimit,
+    "args": run.args,
+    "config_file": run.config_file,
+    "tag": run.tag,
+  }
+  if resources is not None:
+    record["resources"] = resources
+  record.update({"result_file": run.result_file, "argv": run.argv, "command": run.command})
+  return json.dumps(record)
+
+
+def parse_json_line(line):
+  record = json.loads(line)
+  run = Run(record["command"],
+            argv=record["argv"],
+            partitioner=record["partitioner"],
+            instance=record["instance"],
+            threads=int(record["threads"]),
+            k=int(record["k"]),
+            epsilon=float(record["epsilon"]),
+            seed=int(record["seed"]),
+            objective=record["objective"],
+            timelimit=int(record["timelimit"]),
+            result_file=os.path.abspath(record["result_file"]),
+            name=record.get("name", ""),
+            args=record.get("args"),
+            config_file=record.get("config_file", ""),
+            tag=record.get("tag"))
+  assert record.get("id", run.id) == run.id, f"Run id does not match its command: {record['id']}"
+  return run
+
+
+def is_json_workload(workload_file):
+  return workload_file.endswith(".jsonl")
+
+
+def iter_workload(workload_file):
+  parse = parse_json_line if is_json_workload(workload_file) else parse_workload_line
+  with open(workload_file) as workload:
+    for line in workload:
+      if line.strip() != "":
+        yield parse(line)
+
+
+def read_workload(workload_file):
+  return list(iter_workload(workload_file))
+
+
+# Appends a run to a workload file in its format
+def append_to_workload(workload_file, run) -> None:
+  with open(workload_file, "a") as workload:
+    workload.write((run_to_json(run) if is_json_workload(workload_file) else run.command) + "\n")
@@ -8,9 +8,12 @@ import math
 import os
 import os.path
 import glob
-from threading import Timer
 import signal
 
+from instance_index import instance_metadata
+from output_parser import Pattern, after, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -20,6 +23,17 @@ evaluator = os.environ.get("BIPART_EVALUATOR")
 assert (bipart != None and evaluator != None), "check env.sh"
 ###################################
 
+# Values extracted from the BiPart output and the evaluator output (see output_parser.py)
+result_patterns = {
+  # in milliseconds
+  "total_time": Pattern("Timer_0", after("Timer_0, "), lambda value: float(value.split(', ')[1]) / 1000.0),
+}
+evaluator_patterns = {
+  "cut": Pattern("cut", r"cut=([^ ]*)", int),
+  "km1": Pattern("km1", r"km1=([^ ]*)", int),
+  "imbalance": Pattern("imbalance", r"imbalance=([^ ]*)", float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("threads", type=int)
@@ -37,15 +51,7 @@ if args.name != "":
   algorithm = args.name
 
 # Read Number of Nodes
-hg = open(args.graph, 'r')
-for line in hg:
-     # ignore comment lines
-    if line.startswith('%'):
-        continue
-    hg_param = line.split()
-    numNodes= hg_param[1]
-    break;
-hg.close()
+numNodes = instance_metadata(args.graph, "hmetis")["n"]
 
 exp = 1.0 / math.log(args.k,2)
 ufactor = 50.0 * (2 * math.pow((1 + args.epsilon), exp)
@@ -55,7 +61,7 @@ ufactor=3
 
 # Run BiPart
 bipart_output_file = os.path.basename(str(args.graph)) + ".bipart.k" + str(args.k) + ".seed" + str(args.seed) + ".t" + str(args.threads) + ".epsilon" + str(args.epsilon) + ".partition"
-start = time.time()
+start = time.monotonic()
 
 bipart_proc = subprocess.Popen([bipart,
                                 '--balance=' + str(ufactor),
@@ -83,13 +89,13 @@ print(' '.join([bipart,
 def kill_proc():
 	os.killpg(os.getpgid(bipart_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = bipart_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(bipart_proc.stdout, result_patterns, echo=True, start=start)
+bipart_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
-print(out)
+print()
 
 total_time = end - start
 cut = 2147483647
@@ -97,33 +103,30 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
+# unlike total_time, no fallback to the wall time
+reported_time = 2147483647
 
 if bipart_proc.returncode == 0:
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "Timer_0" in s:
-      total_time = float(s.split('Timer_0, ')[1].split(', ')[1]) / 1000.0
+  total_time = result.get("total_time", total_time)
+  reported_time = result.get("total_time", reported_time)
 
-  out, err = subprocess.Popen([evaluator,
-                               '-h' + str(args.graph),
-                               '-b' + str(bipart_output_file),
-                               '-k' + str(args.k)],
-                              stdout=subprocess.PIPE, universal_newlines=True).communicate()
+  evaluator_proc = subprocess.Popen([evaluator,
+                                     '-h' + str(args.graph),
+                                     '-b' + str(bipart_output_file),
+                                     '-k' + str(args.k)],
+                                    stdout=subprocess.PIPE, universal_newlines=True)
+  evaluation = parse_output(evaluator_proc.stdout, evaluator_patterns)
+  evaluator_proc.wait()
 
   print([evaluator,
                                '-h' + str(args.graph),
                                '-b' + str(bipart_output_file),
                                '-k' + str(args.k)])
 
-  # Extract metrics out of Mondriaan Evaluator output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "cut" in s:
-      cut = int(s.split('cut=')[1].split(' ')[0])
-    if "km1" in s:
-      km1 = int(s.split('km1=')[1].split(' ')[0])
-    if "imbalance" in s:
-      imbalance = float(s.split('imbalance=')[1].split(' ')[0])
+  cut = evaluation.get("cut", cut)
+  km1 = evaluation.get("km1", km1)
+  imbalance = evaluation.get("imbalance", imbalance)
 elif bipart_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
   total_time = 2147483647
@@ -133,7 +136,7 @@ else:
 
 # os.remove(bipart_output_file)
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -147,4 +150,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      reported_time,
+      2147483647,
       sep=",")
@@ -8,9 +8,12 @@ import math
 import os
 import os.path
 import shutil
-from threading import Timer
 import signal
 
+from instance_index import instance_metadata
+from output_parser import Pattern, parse_output, token
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -19,6 +22,16 @@ hmetis = os.environ.get("HMETIS")
 assert (hmetis != None), "check env.sh"
 ###################################
 
+# Values extracted from the hMetis output (see output_parser.py)
+result_patterns = {
+  "cut": Pattern("Hyperedge Cut", token(2), lambda value: int(value.split('.')[0])),
+  "soed": Pattern("Sum of External", token(4), lambda value: int(value.split('.')[0])),
+  "total_time": Pattern("Multilevel", token(1), float),
+  # the first parenthesized value of each [...] block
+  "part_sizes": Pattern("[", r"\(([^\]]*?)\)[^\]]*\]", float, keep="all"),
+  "io_time": Pattern("I/O:", token(1), float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("k", type=int)
@@ -36,15 +49,7 @@ if args.name != "":
   algorithm = args.name
 
 # Read Number of Nodes
-hg = open(args.graph, 'r')
-for line in hg:
-     # ignore comment lines
-    if line.startswith('%'):
-        continue
-    hg_param = line.split()
-    numNodes= hg_param[1]
-    break;
-hg.close()
+numNodes = instance_metadata(args.graph, "hmetis")["n"]
 
 if args.objective == "cut":
   objective = "cut"
@@ -78,16 +83,17 @@ hmetis_command = [hmetis,
                   '-seed='+str(args.seed)]
 if objective == "soed":
   hmetis_command.extend(["-reconst"])
+start = time.monotonic()
 hmetis_proc = subprocess.Popen(hmetis_command, stdout=subprocess.PIPE, universal_newlines=True, preexec_fn=os.setsid)
 
 def kill_proc():
 	os.killpg(os.getpgid(hmetis_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = hmetis_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(hmetis_proc.stdout, result_patterns, start=start)
+hmetis_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 part_sizes = []
 total_time = 2147483647
@@ -97,24 +103,17 @@ soed = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
+io_time = 2147483647
 
 if hmetis_proc.returncode == 0:
-  # Extract metrics out of hMetis output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if ("Hyperedge Cut" in s):
-      cut = int(s.split()[2].split('.')[0])
-    if ("Sum of External" in s):
-      soed = int(s.split()[4].split('.')[0])
-      km1 = soed - cut
-    if ("Multilevel" in s):
-      total_time = float(s.split()[1])
-    if ("[" in s):
-      split = s.split(']')
-      for token in split[:-1]:
-        t = re.search('\(.*?\)', token)
-        part_size = float(t.group(0)[1:-1])
-        part_sizes.append(part_size)
+  cut = result.get("cut", cut)
+  if "soed" in result:
+    soed = result["soed"]
+    km1 = soed - cut
+  total_time = result.get("total_time", total_time)
+  io_time = result.get("io_time", io_time)
+  part_sizes = result.get("part_sizes", part_sizes)
 elif hmetis_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
@@ -126,7 +125,7 @@ if len(part_sizes) > 0:
   total_weight = sum(part_sizes)
   imbalance = float(max_part_size) / math.ceil(float(total_weight)/args.k) - 1.0
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -140,6 +139,10 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      io_time,
       sep=",")
 
 if args.partition_folder != "":
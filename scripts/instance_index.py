@@ -0,0 +1,235 @@
+#!/usr/bin/python3
+import array
+import hashlib
+import json
+import ntpath
+import os
+import os.path
+import socket
+import sys
+
+# Index of instance metadata, built once per instance by setup_experiments.py
+# (which also uses it to filter instances) and read by the wrapper scripts:
+#   n, m, pins, weighted (vertex weights), edge_weighted, total_weight (of the vertices),
+#   min_degree, avg_degree, max_degree (of the vertices), max_edge_size
+#
+# There is one index file per instance folder, located in $INSTANCE_INDEX_DIR
+# (default: ~/.cache/hypergraph_partitioner/instance_index), since the instance
+# folders are often read-only. Entries are invalidated if the size or the
+# modification time of the instance changes.
+#
+# The wrapper scripts never write the index: runs on instances without a
+# current entry (e.g. if the index is not writable) only read the header.
+#
+# The degree statistics are computed for hMetis, PaToH and Metis instances,
+# for Scotch and Zoltan instances only the header is read.
+
+index_dir = os.environ.get("INSTANCE_INDEX_DIR", os.path.expanduser("~/.cache/hypergraph_partitioner/instance_index"))
+
+# folder -> index, loaded once per process
+_indices = {}
+
+
+def _index_file(folder):
+  return f"{index_dir}/{hashlib.sha1(folder.encode()).hexdigest()[:16]}.json"
+
+
+def _load(folder):
+  if folder not in _indices:
+    _indices[folder] = {}
+    if os.path.exists(_index_file(folder)):
+      try:
+        with open(_index_file(folder)) as f:
+          _indices[folder] = json.load(f)
+      except ValueError:
+        # rebuilt by the next setup
+        pass
+  return _indices[folder]
+
+
+def _store(folder, entries) -> None:
+  _indices.setdefault(folder, {}).update(entries)
+  try:
+    _write(folder, entries)
+  except OSError as e:
+    print(f"Warning: instance index not written ({e}), the runs only read the instance headers", file=sys.stderr)
+
+
+def _write(folder, entries) -> None:
+  os.makedirs(index_dir, exist_ok=True)
+  # merge with the entries written by other processes in the meantime
+  index = {}
+  if os.path.exists(_index_file(folder)):
+    try:
+      with open(_index_file(folder)) as f:
+        index = json.load(f)
+    except ValueError:
+      pass
+  index.update(entries)
+  tmp_file = f"{_index_file(folder)}.{socket.gethostname()}.{os.getpid()}.tmp"
+  with open(tmp_file, "w") as f:
+    json.dump(index, f)
+  os.replace(tmp_file, _index_file(folder))
+  _indices[folder] = index
+
+
+def _lines(f):
+  for line in f:
+    if not line.startswith("%"):
+      yield line
+
+
+def _degree_stats(degrees):
+  if len(degrees) == 0:
+    return {"min_degree": 0, "avg_degree": 0.0, "max_degree": 0}
+  return {"min_degree": min(degrees), "avg_degree": sum(degrees) / len(degrees), "max_degree": max(degrees)}
+
+
+def _scan_hmetis(f):
+  lines = _lines(f)
+  header = [int(value) for value in next(lines).split()]
+  m, n = header[:2]
+  fmt = header[2] if len(header) > 2 else 0
+  edge_weighted = fmt % 10 == 1
+  weighted = fmt >= 10
+  degrees = array.array("L", bytes(n * array.array("L").itemsize))
+  pins = 0
+  max_edge_size = 0
+  for _ in range(m):
+    edge = next(lines).split()[1 if edge_weighted else 0:]
+    pins += len(edge)
+    max_edge_size = max(max_edge_size, len(edge))
+    for pin in edge:
+      degrees[int(pin) - 1] += 1
+  total_weight = n
+  if weighted:
+    total_weight = sum(int(next(lines).split()[0]) for _ in range(n))
+  return {"n": n, "m": m, "pins": pins, "weighted": weighted, "edge_weighted": edge_weighted,
+          "total_weight": total_weight, "max_edge_size": max_edge_size, **_degree_stats(degrees)}
+
+
+def _scan_patoh(f):
+  lines = _lines(f)
+  header = [int(value) for value in next(lines).split()]
+  base, n, m, pins = header[:4]
+  scheme = header[4] if len(header) > 4 else 0
+  # patoh file format uses 0,1,2,3 for weight types
+  weighted = scheme in [1, 3]
+  edge_weighted = scheme in [2, 3]
+  degrees = array.array("L", bytes(n * array.array("L").itemsize))
+  max_edge_size = 0
+  for _ in range(m):
+    edge = next(lines).split()[1 if edge_weighted else 0:]
+    max_edge_size = max(max_edge_size, len(edge))
+    for pin in edge:
+      degrees[int(pin) - base] += 1
+  total_weight = n
+  if weighted:
+    # the cell weights follow the nets
+    total_weight = sum(int(weight) for line in lines for weight in line.split())
+  return {"n": n, "m": m, "pins": pins, "weighted": weighted, "edge_weighted": edge_weighted,
+          "total_weight": total_weight, "max_edge_size": max_edge_size, **_degree_stats(degrees)}
+
+
+def _scan_graph(f):
+  lines = _lines(f)
+  header = next(lines).split()
+  n, m = int(header[0]), int(header[1])
+  # <vertex sizes><vertex weights><edge weights>
+  fmt = header[2].zfill(3) if len(header) > 2 else "000"
+  num_constraints = int(header[3]) if len(header) > 3 else 1
+  skip = (1 if fmt[0] == "1" else 0) + (num_constraints if fmt[1] == "1" else 0)
+  edge_weighted = fmt[2] == "1"
+  weighted = fmt[1] == "1"
+  degrees = array.array("L", bytes(n * array.array("L").itemsize))
+  total_weight = 0
+  for u in range(n):
+    # isolated vertices have empty lines
+    tokens = next(lines, "").split()
+    total_weight += int(tokens[1 if fmt[0] == "1" else 0]) if weighted else 1
+    degrees[u] = (len(tokens) - skip) // (2 if edge_weighted else 1)
+  return {"n": n, "m": m, "pins": 2 * m, "weighted": weighted, "edge_weighted": edge_weighted,
+          "total_weight": total_weight, "max_edge_size": 2, **_degree_stats(degrees)}
+
+
+# Only the properties which are given by the header, the others are None
+def _scan_header(f, input_format):
+  lines = _lines(f)
+  weighted = None
+  if input_format == "hmetis":
+    header = [int(value) for value in next(lines).split()]
+    m, n = header[:2]
+    pins = None
+    weighted = len(header) > 2 and header[2] >= 10
+  elif input_format in ["graph", "metis"]:
+    header = next(lines).split()
+    n, m = int(header[0]), int(header[1])
+    pins = 2 * m
+    weighted = len(header) > 2 and header[2].zfill(3)[1] == "1"
+  elif input_format == "scotch":
+    # version line, then <#vertices> <#arcs>
+    next(lines)
+    n, arcs = [int(value) for value in next(lines).split()[:2]]
+    m, pins = arcs // 2, arcs
+  else:
+    # <index base> <#cells> <#nets> <#pins> [<weight scheme>]
+    header = [int(value) for value in next(lines).split()]
+    n, m, pins = header[1:4]
+    if input_format == "patoh":
+      weighted = len(header) > 4 and header[4] in [1, 3]
+  return {"n": n, "m": m, "pins": pins, "weighted": weighted, "edge_weighted": None,
+          "total_weight": n if weighted is False else None,
+          "max_edge_size": None, "min_degree": None, "avg_degree": None, "max_degree": None}
+
+
+def scan_instance(instance, input_format):
+  with open(instance) as f:
+    if input_format == "hmetis":
+      return _scan_hmetis(f)
+    elif input_format == "patoh":
+      return _scan_patoh(f)
+    elif input_format in ["graph", "metis"]:
+      return _scan_graph(f)
+    return _scan_header(f, input_format)
+
+
+def _is_current(entry, stat, input_format):
+  return (entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+          and entry["format"] == input_format)
+
+
+# Returns the metadata of the instances (given as (path, format) pairs),
+# scanning only those which are not in the index yet
+def instance_metadata_list(instances):
+  result = []
+  missing = {}
+  for instance, input_format in instances:
+    folder = os.path.dirname(os.path.abspath(instance))
+    stat = os.stat(instance)
+    entry = _load(folder).get(ntpath.basename(instance))
+    if not _is_current(entry, stat, input_format):
+      entry = scan_instance(instance, input_format)
+      entry.update({"size": stat.st_size, "mtime": stat.st_mtime, "format": input_format})
+      missing.setdefault(folder, {})[ntpath.basename(instance)] = entry
+    result.append(entry)
+  for folder, entries in missing.items():
+    _store(folder, entries)
+  return result
+
+
+# Read-only lookup for the wrapper scripts: the index entry of the instance,
+# or the properties given by its header if there is no current entry
+def instance_metadata(instance, input_format):
+  entry = _load(os.path.dirname(os.path.abspath(instance))).get(ntpath.basename(instance))
+  if _is_current(entry, os.stat(instance), input_format):
+    return entry
+  with open(instance) as f:
+    return _scan_header(f, input_format)
+
+
+def instance_total_weight(instance, input_format):
+  total_weight = instance_metadata(instance, input_format)["total_weight"]
+  if total_weight is None:
+    # weighted instance without index entry
+    total_weight = scan_instance(instance, input_format)["total_weight"]
+  return total_weight
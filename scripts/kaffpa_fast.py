@@ -7,9 +7,11 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 
+from output_parser import Pattern, after, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -18,6 +20,13 @@ kaffpa = os.environ.get("KAFFPA")
 assert (kaffpa != None), "check env.sh"
 ###################################
 
+# Values extracted from the KaFFPa output (see output_parser.py)
+result_patterns = {
+  "cut": Pattern("cut", after("cut"), int),
+  "imbalance": Pattern("balance", after("balance"), lambda value: float(value) - 1.0),
+  "total_time": Pattern("time spent for partitioning", after("time spent for partitioning"), float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("k", type=int)
@@ -35,6 +44,7 @@ if args.name != "":
 
 # Run KaFFPa
 output_part_file = args.graph + ".part." + str(args.k) + "." + str(args.seed)
+start = time.monotonic()
 kaffpa_proc = subprocess.Popen([kaffpa,
                                 args.graph,
                                 "--k=" + str(args.k),
@@ -47,11 +57,11 @@ kaffpa_proc = subprocess.Popen([kaffpa,
 def kill_proc():
 	os.killpg(os.getpgid(kaffpa_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = kaffpa_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(kaffpa_proc.stdout, result_patterns, start=start)
+kaffpa_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -59,25 +69,21 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 if kaffpa_proc.returncode == 0:
   # Extract metrics out of MT-KaHIP output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "cut" in s:
-      cut = int(s.split('cut')[1])
-      km1 = int(s.split('cut')[1])
-    if "balance" in s:
-      imbalance = float(s.split('balance')[1]) - 1.0
-    if "time spent for partitioning" in s:
-      total_time = float(s.split('time spent for partitioning')[1])
+  cut = result.get("cut", cut)
+  km1 = cut
+  imbalance = result.get("imbalance", imbalance)
+  total_time = result.get("total_time", total_time)
   os.remove(output_part_file)
 elif kaffpa_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -91,4 +97,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      2147483647,
       sep=",")
@@ -8,10 +8,12 @@ import math
 import os
 import os.path
 import shutil
-from threading import Timer
 import signal
 import shutil
 
+from output_parser import Pattern, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -21,6 +23,14 @@ kahypar_k_config = os.environ.get("KAHYPAR_K_CONFIG")
 assert (kahypar_k != None and kahypar_k_config != None), "check env.sh"
 ###################################
 
+# Values extracted from the KaHyPar output (see output_parser.py)
+result_patterns = {
+  "km1": Pattern("RESULT", r" km1=([^ ]*)", int),
+  "cut": Pattern("RESULT", r" cut=([^ ]*)", int),
+  "total_time": Pattern("RESULT", r" totalPartitionTime=([^ ]*)", float),
+  "imbalance": Pattern("RESULT", r" imbalance=([^ ]*)", float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("k", type=int)
@@ -51,17 +61,18 @@ kahypar_command = [kahypar_k,
                    "--sp-process=true"]
 if args.partition_folder != "":
   kahypar_command.extend(["--write-partition=true"])
+start = time.monotonic()
 kahypar_k_proc = subprocess.Popen(kahypar_command,
                                   stdout=subprocess.PIPE, universal_newlines=True, preexec_fn=os.setsid)
 
 def kill_proc():
 	os.killpg(os.getpgid(kahypar_k_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = kahypar_k_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(kahypar_k_proc.stdout, result_patterns, start=start)
+kahypar_k_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -69,22 +80,19 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 if kahypar_k_proc.returncode == 0:
-  # Extract metrics out of KaHyPar-CA output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "RESULT" in s:
-      km1 = int(s.split(" km1=")[1].split(" ")[0])
-      cut = int(s.split(" cut=")[1].split(" ")[0])
-      total_time = float(s.split(" totalPartitionTime=")[1].split(" ")[0])
-      imbalance = float(s.split(" imbalance=")[1].split(" ")[0])
+  km1 = result.get("km1", km1)
+  cut = result.get("cut", cut)
+  total_time = result.get("total_time", total_time)
+  imbalance = result.get("imbalance", imbalance)
 elif kahypar_k_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -98,6 +106,10 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      2147483647,
       sep=",")
 
 if args.partition_folder != "":
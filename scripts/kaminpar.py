@@ -7,9 +7,11 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 
+from output_parser import Pattern, after, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -18,6 +20,14 @@ kaminpar = os.environ.get("KAMINPAR")
 assert (kaminpar != None), "check env.sh"
 ###################################
 
+# Values extracted from the KaMinPar output (see output_parser.py)
+result_patterns = {
+  "cut": Pattern("Edge cut:", after("Edge cut:"), int),
+  "imbalance": Pattern("Imbalance:", after("Imbalance:"), float),
+  # second to last field of the timer line
+  "total_time": Pattern("|- Partitioning:", r"(?:^| )([^ ]*) [^ ]*$", float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("threads", type=int)
@@ -44,17 +54,18 @@ if args.k >= 1024:
   kaminpar_call.append("--fast-ip")
 
 # Run KaFFPa
+start = time.monotonic()
 kaminpar_proc = subprocess.Popen(kaminpar_call,
                                 stdout=subprocess.PIPE, universal_newlines=True, preexec_fn=os.setsid)
 
 def kill_proc():
 	os.killpg(os.getpgid(kaminpar_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = kaminpar_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(kaminpar_proc.stdout, result_patterns, start=start)
+kaminpar_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -62,23 +73,19 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 if kaminpar_proc.returncode == 0:
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "Edge cut:" in s:
-      cut = int(s.split('Edge cut:')[1].strip())
-      km1 = cut
-    if "Imbalance:" in s:
-      imbalance = float(s.split('Imbalance:')[1].strip())
-    if "|- Partitioning:" in s:
-      total_time = float(s.split(' ')[-2].strip())
+  cut = result.get("cut", cut)
+  km1 = cut
+  imbalance = result.get("imbalance", imbalance)
+  total_time = result.get("total_time", total_time)
 elif kaminpar_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -92,4 +99,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      2147483647,
       sep=",")
@@ -7,9 +7,12 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 
+from instance_index import instance_metadata
+from output_parser import Pattern, parse_output, token
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -18,6 +21,14 @@ metis = os.environ.get("METIS")
 assert (metis != None), "check env.sh"
 ###################################
 
+# Values extracted from the METIS output (see output_parser.py)
+result_patterns = {
+  "cut": Pattern("Edgecut:", token(2), lambda value: int(value.split(',')[0])),
+  "total_time": Pattern("Partitioning:", token(1), float),
+  "max_part_size": Pattern("actual:", token(3), lambda value: float(value.split(',')[0])),
+  "io_time": Pattern("I/O:", token(1), float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("k", type=int)
@@ -34,15 +45,7 @@ if args.name != "":
   algorithm = args.name
 
 # Read Number of Nodes
-hg = open(args.graph, 'r')
-for line in hg:
-     # ignore comment lines
-    if line.startswith('%'):
-        continue
-    hg_param = line.split()
-    numNodes= hg_param[0]
-    break;
-hg.close()
+numNodes = instance_metadata(args.graph, "graph")["n"]
 
 
 ufactor = args.epsilon * 1000.0
@@ -56,16 +59,17 @@ metis_command = [metis,
                  '-nooutput',
                  '-seed='+str(args.seed)]
 
+start = time.monotonic()
 metis_proc = subprocess.Popen(metis_command, stdout=subprocess.PIPE, universal_newlines=True, preexec_fn=os.setsid)
 
 def kill_proc():
 	os.killpg(os.getpgid(metis_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = metis_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(metis_proc.stdout, result_patterns, start=start)
+metis_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -74,25 +78,22 @@ soed = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
+io_time = 2147483647
 
 if metis_proc.returncode == 0:
-  # Extract metrics out of hMetis output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if ("Edgecut:" in s):
-      cut = int(s.split()[2].split(',')[0])
-      km1 = cut
-    if ("Partitioning:" in s):
-      total_time = float(s.split()[1])
-    if ("actual:" in s):
-      max_part_size = float(s.split()[3].split(',')[0])
-      imbalance = max_part_size / math.ceil(float(numNodes)/args.k) - 1.0
+  cut = result.get("cut", cut)
+  km1 = cut
+  total_time = result.get("total_time", total_time)
+  io_time = result.get("io_time", io_time)
+  if "max_part_size" in result:
+    imbalance = result["max_part_size"] / math.ceil(float(numNodes)/args.k) - 1.0
 elif metis_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -106,4 +107,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      io_time,
       sep=",")
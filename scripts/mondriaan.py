@@ -8,9 +8,11 @@ import math
 import os
 import os.path
 import glob
-from threading import Timer
 import signal
 
+from output_parser import Pattern, after, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -20,6 +22,14 @@ evaluator = os.environ.get("MONDRIAAN_EVALUATOR")
 assert (mondriaan != None and evaluator != None), "check env.sh"
 ###################################
 
+# Values extracted from the evaluator output (see output_parser.py), the
+# output of Mondriaan itself is only used for the time to first output
+evaluator_patterns = {
+  "cut": Pattern("cut", after("="), int, exclude="RESULT"),
+  "km1": Pattern("km1", after("="), int, exclude="RESULT"),
+  "imbalance": Pattern("imbalance", after("="), float, exclude="RESULT"),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("k", type=int)
@@ -41,7 +51,7 @@ elif args.objective == "km1":
   objective = "lambda1"
 
 # Run Mondriaan
-start = time.time()
+start = time.monotonic()
 mondriaan_proc = subprocess.Popen([mondriaan,
                                    str(args.graph),
                                    str(args.k),
@@ -54,11 +64,11 @@ mondriaan_proc = subprocess.Popen([mondriaan,
 def kill_proc():
 	os.killpg(os.getpgid(mondriaan_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = mondriaan_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(mondriaan_proc.stdout, {}, start=start)
+mondriaan_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = end - start
 cut = 2147483647
@@ -66,24 +76,21 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 hgr_file = re.sub('.mondriaan.mtx$', '', args.graph)
 mondriaan_output_file = args.graph+'-v'+str(args.k)+'-s'+str(args.seed)
 if mondriaan_proc.returncode == 0:
-  out, err = subprocess.Popen([evaluator,
-                               hgr_file,
-                               mondriaan_output_file],
-                              stdout=subprocess.PIPE, universal_newlines=True).communicate()
-
-  # Extract metrics out of Mondriaan Evaluator output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "cut" in s and "RESULT" not in s:
-      cut = int(s.split('=')[1])
-    if "km1" in s and "RESULT" not in s:
-      km1 = int(s.split('=')[1])
-    if "imbalance" in s and "RESULT" not in s:
-      imbalance = float(s.split('=')[1])
+  evaluator_proc = subprocess.Popen([evaluator,
+                                     hgr_file,
+                                     mondriaan_output_file],
+                                    stdout=subprocess.PIPE, universal_newlines=True)
+  evaluation = parse_output(evaluator_proc.stdout, evaluator_patterns)
+  evaluator_proc.wait()
+
+  cut = evaluation.get("cut", cut)
+  km1 = evaluation.get("km1", km1)
+  imbalance = evaluation.get("imbalance", imbalance)
 elif mondriaan_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
   total_time = 2147483647
@@ -91,7 +98,7 @@ else:
   failed = "yes"
   total_time = 2147483647
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(hgr_file),
       timeout,
@@ -105,6 +112,10 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      2147483647,
+      2147483647,
       sep=",")
 
 def remove_if_exists(file):
@@ -34,6 +34,8 @@ if success:
   parse_required_value(result, "cut", parser=int)
   parse_required_value(result, "totalPartitionTime", out="total_time")
   parse_required_value(result, "imbalance")
+  # input reading, part of the detailed timings
+  parse_or_default(result, "io_hypergraph", invalid, out="io_time")
 
 if success is not None:
   print_result(algorithm, args)
@@ -1,29 +1,49 @@
 import subprocess
 import argparse
 import sys
+import time
 import os
 import os.path
-from threading import Timer
 import signal
 import shlex
 import ntpath
 import shutil
 
+from output_parser import Pattern, parse_output
+from timelimit import start_timer
+
 #######################################
 # Common functionality for Mt-KaHyPar #
 #######################################
 
 invalid = 2147483647
+# number of output lines reported for a failed run
+fail_msg_lines = 50
+
+# Only the result line is kept from the Mt-KaHyPar output (see output_parser.py)
+result_patterns = {
+  "result_line": Pattern("RESULT", r"^(.*)$", keep="first"),
+}
 
 # Manage the result via a global. A bit ugly, but should be OK for a script
-_result_values = {
+_initial_result_values = {
   "timeout": "no",
   "failed": "no",
+  "wall_time": invalid,
+  "first_output_time": invalid,
+  "io_time": invalid,
 }
+_result_values = dict(_initial_result_values)
 _result_initialized = False
 
 
 def get_args():
+  # a worker of the pool (experiments/worker_pool.py) runs several wrappers with this module
+  global _result_initialized
+  _result_values.clear()
+  _result_values.update(_initial_result_values)
+  _result_initialized = False
+
   parser = argparse.ArgumentParser()
   parser.add_argument("graph", type=str)
   parser.add_argument("threads", type=int)
@@ -72,6 +92,7 @@ def run_mtkahypar(mt_kahypar, args, default_args, print_fail_msg=True, detect_in
   if args.partition_folder != "":
     cmd.extend(["--write-partition-file=true"])
     cmd.extend(["--partition-output-folder=" + args.partition_folder])
+  start = time.monotonic()
   mt_kahypar_proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, universal_newlines=True, preexec_fn=os.setsid)
 
   # handle early interrupt cases where the Mt-KaHyPar process should be killed
@@ -81,26 +102,25 @@ def run_mtkahypar(mt_kahypar, args, default_args, print_fail_msg=True, detect_in
   signal.signal(signal.SIGINT, kill_proc)
   signal.signal(signal.SIGTERM, kill_proc)
 
-  t = Timer(args.timelimit, kill_proc)
-  t.start()
-  out, err = mt_kahypar_proc.communicate()
+  t = start_timer(args.timelimit, kill_proc)
+  result = parse_output(mt_kahypar_proc.stdout, result_patterns, start=start, tail=fail_msg_lines)
+  mt_kahypar_proc.wait()
   t.cancel()
+  _result_values["wall_time"] = time.monotonic() - start
+  _result_values["first_output_time"] = result.get("first_output_time", invalid)
 
   if mt_kahypar_proc.returncode == 0:
-    # Extract metrics out of Mt-KaHyPar output
-    for line in out.split('\n'):
-      result_line = str(line).strip()
-      if "RESULT" in result_line:
-        return result_line, True
-    assert False, "No result line found!"
+    assert "result_line" in result, "No result line found!"
+    return result["result_line"], True
   elif mt_kahypar_proc.returncode == -signal.SIGTERM:
     _result_values["timeout"] = "yes"
-    return out, False
+    return result["tail"], False
   else:
     _result_values["failed"] = "yes"
-    if err and print_fail_msg:
-      print(err, file=sys.stderr)
-    return out, False
+    if print_fail_msg:
+      print(f"Mt-KaHyPar failed with exit code {mt_kahypar_proc.returncode}, last lines of its output:\n{result['tail']}",
+            file=sys.stderr)
+    return result["tail"], False
 
 
 # for debugging
@@ -178,12 +198,18 @@ def print_result(algorithm, args):
   total_time = _result_values["total_time"]
   km1 = _result_values["km1"]
   cut = _result_values["cut"]
+  wall_time = _result_values["wall_time"]
+  first_output_time = _result_values["first_output_time"]
+  io_time = _result_values["io_time"]
   del _result_values["timeout"]
   del _result_values["failed"]
   del _result_values["imbalance"]
   del _result_values["total_time"]
   del _result_values["km1"]
   del _result_values["cut"]
+  del _result_values["wall_time"]
+  del _result_values["first_output_time"]
+  del _result_values["io_time"]
   print(algorithm,
         ntpath.basename(args.graph),
         timeout,
@@ -197,13 +223,18 @@ def print_result(algorithm, args):
         km1,
         cut,
         failed,
+        wall_time,
+        first_output_time,
+        total_time,
+        io_time,
         # note: the iteration order of a dict matches the insertion order
         # (guaranteed since python 3.7)
         *_result_values.values().__iter__(),
         sep=",")
 
   if args.header != "":
-    header = ["algorithm", "graph", "timeout", "seed", "k", "epsilon", "num_threads", "imbalance", "totalPartitionTime", "objective", "km1", "cut", "failed"]
+    header = ["algorithm", "graph", "timeout", "seed", "k", "epsilon", "num_threads", "imbalance", "totalPartitionTime", "objective", "km1", "cut", "failed",
+              "wallTime", "firstOutputTime", "reportedPartitionTime", "ioTime"]
     if args.tag:
       header.insert(0, "tag")
     header.extend(_result_values.keys())
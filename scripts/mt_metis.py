@@ -7,9 +7,11 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 
+from output_parser import Pattern, after, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -18,6 +20,14 @@ mt_metis = os.environ.get("MT_METIS")
 assert (mt_metis != None), "check env.sh"
 ###################################
 
+# Values extracted from the mt-metis output (see output_parser.py)
+result_patterns = {
+  "cut": Pattern("Best Objective", after("Best Objective:"), int),
+  # without unit
+  "total_time": Pattern("Total Time", after("Total Time:"), lambda value: float(value[:-1])),
+  "imbalance": Pattern("constraint #0", after("constraint #0:"), lambda value: float(value.split(' ')[2]) - 1.0),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("threads", type=int)
@@ -35,6 +45,7 @@ if args.name != "":
   algorithm = args.name
 
 # Run Mt-KaHIP
+start = time.monotonic()
 mt_metis_proc = subprocess.Popen([mt_metis,
                                   "--threads=" + str(args.threads),
                                   "--balance=" + str(args.epsilon + 1.0),
@@ -49,11 +60,11 @@ mt_metis_proc = subprocess.Popen([mt_metis,
 def kill_proc():
 	os.killpg(os.getpgid(mt_metis_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = mt_metis_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(mt_metis_proc.stdout, result_patterns, start=start)
+mt_metis_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -61,24 +72,20 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 if mt_metis_proc.returncode == 0:
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "Best Objective" in s:
-      cut = int(s.split('Best Objective:')[1])
-      km1 = int(s.split('Best Objective:')[1])
-    if "Total Time" in s:
-      total_time = float(s.split('Total Time:')[1][:-1])
-    if "constraint #0" in s:
-      imbalance = float(s.split("constraint #0:")[1].split(' ')[2]) - 1.0
+  cut = result.get("cut", cut)
+  km1 = cut
+  total_time = result.get("total_time", total_time)
+  imbalance = result.get("imbalance", imbalance)
 
 elif mt_metis_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -92,4 +99,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      2147483647,
       sep=",")
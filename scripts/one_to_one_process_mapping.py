@@ -7,6 +7,8 @@ import os.path
 from threading import Timer
 import signal
 
+from output_parser import Pattern, parse_output
+
 ###################################
 # SETUP ENV
 ###################################
@@ -14,6 +16,13 @@ process_mapping = os.environ.get("PROCESS_MAPPING")
 assert (process_mapping != None), "check env.sh"
 ###################################
 
+# Values extracted from the result line of the process mapping (see output_parser.py)
+result_patterns = {
+  "process_mapping": Pattern("RESULT", r" process_mapping=([^ ]*)", int),
+  "approximation_factor": Pattern("RESULT", r" approximation_factor=([^ ]*)", float),
+  "totalMappingTime": Pattern("RESULT", r" totalPartitionTime=([^ ]*)", float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("result_file", type=str)
@@ -64,18 +73,14 @@ if result["timeout"] == "no" and result["failed"] == "no":
 
     t = Timer(28800, kill_proc)
     t.start()
-    out, err = process_mapping_proc.communicate()
+    mapping_result = parse_output(process_mapping_proc.stdout, result_patterns)
+    process_mapping_proc.wait()
     t.cancel()
     end = time.time()
 
-    if process_mapping_proc.returncode == 0:
-      for line in out.split('\n'):
-        s = str(line).strip()
-        if "RESULT" in s:
-          result["process_mapping"] = int(s.split(" process_mapping=")[1].split(" ")[0])
-          result["approximation_factor"] = float(s.split(" approximation_factor=")[1].split(" ")[0])
-          result["totalMappingTime"] = float(s.split(" totalPartitionTime=")[1].split(" ")[0])
-          result["totalTime"] = float(result["totalPartitionTime"]) + result["totalMappingTime"]
+    if process_mapping_proc.returncode == 0 and "totalMappingTime" in mapping_result:
+      result.update(mapping_result)
+      result["totalTime"] = float(result["totalPartitionTime"]) + result["totalMappingTime"]
 
 # CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,
 # imbalance,totalPartitionTime,totalMappingTime,totalTime,
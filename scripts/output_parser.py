@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+import collections
+import re
+import sys
+import time
+
+# Streaming evaluation of the output of a partitioner. Instead of buffering the
+# complete stdout (communicate()) and scanning it afterwards, each wrapper
+# declares a table of the values it extracts, e.g.
+#
+#   result_patterns = {
+#     "km1": Pattern("RESULT", r" km1=(\S+)", int),
+#     "cut": Pattern("RESULT", r" cut=(\S+)", int),
+#   }
+#
+# and passes the stdout pipe of the partitioner to parse_output(). Every line
+# (stripped) is first checked for the substring `trigger`, only then the
+# precompiled regular expression is applied. Only the matched values are kept,
+# so the memory of the wrapper does not depend on the verbosity of the
+# partitioner. Options of a pattern:
+#   keep     "last" (default) or "first" match, or "all": a list of all matches
+#            (uses findall, i.e. every match within a line)
+#   skip     number of matching lines to ignore (e.g. statistics that are
+#            printed before and after partitioning)
+#   exclude  lines which contain this substring are ignored
+# A line whose value can not be converted is ignored.
+#
+# Given the time.monotonic() value at which the partitioner was started,
+# parse_output() also returns the time until its first line of output as
+# "first_output_time" (not returned if there was no output), which
+# approximates the startup and input reading time of tools that log early.
+# With tail > 0, the last tail lines of the output are returned as "tail"
+# (e.g. to report the output of a failed run).
+
+
+# Regular expression which captures the index-th whitespace separated token
+def token(index):
+  return r"^" + r"\S+\s+" * index + r"(\S+)"
+
+
+# Regular expression which captures the text after the first occurrence of
+# marker up to the next occurrence, like line.split(marker)[1]
+def after(marker):
+  marker = re.escape(marker)
+  return marker + r"(.*?)(?:" + marker + r"|$)"
+
+
+class Pattern:
+  def __init__(self, trigger, regex, convert=str, *, keep="last", skip=0, exclude=None) -> None:
+    assert keep in ["first", "last", "all"], f"invalid keep: {keep}"
+    self.trigger = trigger
+    self.regex = re.compile(regex)
+    self.convert = convert
+    self.keep = keep
+    self.skip = skip
+    self.exclude = exclude
+
+
+def _match(pattern, line, values, key, skipped) -> None:
+  if pattern.trigger not in line or (pattern.exclude is not None and pattern.exclude in line):
+    return
+  if skipped.get(key, 0) < pattern.skip:
+    skipped[key] = skipped.get(key, 0) + 1
+    return
+  try:
+    if pattern.keep == "all":
+      values.setdefault(key, []).extend(pattern.convert(value) for value in pattern.regex.findall(line))
+      return
+    match = pattern.regex.search(line)
+    if match is None or (pattern.keep == "first" and key in values):
+      return
+    values[key] = pattern.convert(match.group(1))
+  except (ValueError, IndexError):
+    pass
+
+
+# Reads the stream line by line and returns the values of the patterns which
+# matched. With echo, the output is passed through to stdout.
+def parse_output(stream, patterns, *, echo=False, start=None, tail=0):
+  values = {}
+  skipped = {}
+  last_lines = collections.deque(maxlen=tail)
+  for line in stream:
+    if start is not None and "first_output_time" not in values:
+      values["first_output_time"] = time.monotonic() - start
+    if echo:
+      sys.stdout.write(line)
+    if tail > 0:
+      last_lines.append(line)
+    line = line.strip()
+    for key, pattern in patterns.items():
+      _match(pattern, line, values, key, skipped)
+  if tail > 0:
+    values["tail"] = "".join(last_lines)
+  return values
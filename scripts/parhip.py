@@ -7,9 +7,11 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 
+from output_parser import Pattern, after, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -18,6 +20,13 @@ parhip = os.environ.get("PARHIP")
 assert (parhip != None), "check env.sh"
 ###################################
 
+# Values extracted from the ParHIP output (see output_parser.py)
+result_patterns = {
+  "cut": Pattern("final edge cut", after("final edge cut"), int),
+  "imbalance": Pattern("final balance", after("final balance"), lambda value: float(value) - 1.0),
+  "total_time": Pattern("total partitioning time elapsed", after("total partitioning time elapsed"), float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("threads", type=int)
@@ -35,6 +44,7 @@ if args.name != "":
   algorithm = args.name
 
 # Run ParHIP
+start = time.monotonic()
 parhip_proc = subprocess.Popen(["mpirun -N " +str(args.threads) + " " +
                                 parhip + " " +
                                 args.graph + " "
@@ -47,11 +57,11 @@ parhip_proc = subprocess.Popen(["mpirun -N " +str(args.threads) + " " +
 def kill_proc():
 	os.killpg(os.getpgid(parhip_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = parhip_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(parhip_proc.stdout, result_patterns, start=start)
+parhip_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -59,24 +69,20 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 if parhip_proc.returncode == 0:
   # Extract metrics out of ParHIP output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "final edge cut" in s:
-      cut = int(s.split('final edge cut')[1])
-      km1 = int(s.split('final edge cut')[1])
-    if "final balance" in s:
-      imbalance = float(s.split('final balance')[1]) - 1.0
-    if "total partitioning time elapsed" in s:
-      total_time = float(s.split('total partitioning time elapsed')[1])
+  cut = result.get("cut", cut)
+  km1 = cut
+  imbalance = result.get("imbalance", imbalance)
+  total_time = result.get("total_time", total_time)
 elif parhip_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -90,4 +96,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      2147483647,
       sep=",")
@@ -7,10 +7,12 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 import shutil
 
+from output_parser import Pattern, after, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -23,6 +25,16 @@ experiment_dir = os.path.join(os.getcwd(), 'parkway_hg_temps')
 assert (parkway != None), "check env.sh"
 ###################################
 
+# Values extracted from the Parkway output and the evaluator output (see output_parser.py)
+result_patterns = {
+  "total_time": Pattern("TOTAL TIME", after("="), float),
+}
+evaluator_patterns = {
+  "cut": Pattern("cut", after("="), int),
+  "km1": Pattern("km1", after("="), int),
+  "imbalance": Pattern("imbalance", after("="), float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("threads", type=int)
@@ -51,6 +63,7 @@ conversion_proc = subprocess.Popen([hgr_to_parkway_converter,
                                     "-o" + parkway_file],
                                     stdout=subprocess.PIPE, universal_newlines=True).communicate()
 # Run Parkway
+start = time.monotonic()
 parkway_proc = subprocess.Popen(["mpirun -N " +str(args.threads) + " " +
                                  parkway + " " +
                                  "-p" + str(args.k) + " " +
@@ -65,11 +78,11 @@ parkway_proc = subprocess.Popen(["mpirun -N " +str(args.threads) + " " +
 def kill_proc():
 	os.killpg(os.getpgid(parkway_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = parkway_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(parkway_proc.stdout, result_patterns, start=start)
+parkway_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -77,37 +90,29 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 if parkway_proc.returncode == 0:
-  # Search for partition time in parkway output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "TOTAL TIME" in s:
-      total_time = float(s.split('=')[1])
+  total_time = result.get("total_time", total_time)
 
   # Evaluate Partition
   parkway_partition_file = parkway_file + ".part." + str(args.k) + "." + str(args.seed)
-  evaluator_out, evaluator_err = subprocess.Popen([evaluator,
-                                                  args.graph,
-                                                  parkway_partition_file],
-                                                  stdout=subprocess.PIPE, universal_newlines=True).communicate()
-
-  # Extract metrics out of evaluator
-  for line in evaluator_out.split('\n'):
-    s = str(line).strip()
-    if "cut" in s:
-      cut = int(s.split('=')[1])
-    if "km1" in s:
-      km1 = int(s.split('=')[1])
-    if "imbalance" in s:
-      imbalance = float(s.split('=')[1])
+  evaluator_proc = subprocess.Popen([evaluator,
+                                     args.graph,
+                                     parkway_partition_file],
+                                    stdout=subprocess.PIPE, universal_newlines=True)
+  evaluation = parse_output(evaluator_proc.stdout, evaluator_patterns)
+  evaluator_proc.wait()
+  cut = evaluation.get("cut", cut)
+  km1 = evaluation.get("km1", km1)
+  imbalance = evaluation.get("imbalance", imbalance)
 
 elif parkway_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -121,6 +126,10 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      2147483647,
       sep=",")
 
 shutil.rmtree(wd)
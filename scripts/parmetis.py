@@ -7,9 +7,11 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 
+from output_parser import Pattern, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -18,6 +20,13 @@ parmetis = os.environ.get("PARMETIS")
 assert (parmetis != None), "check env.sh"
 ###################################
 
+# Values extracted from the ParMETIS output (see output_parser.py)
+result_patterns = {
+  "cut": Pattern("Cut:", r"Cut:\s*(\S+)", int),
+  "total_time": Pattern("Total:", r"Sum:\s*([^\s,]+)", float),
+  "imbalance": Pattern("Balance:", r"Balance:\s*(\S+)", lambda value: float(value) - 1.0),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("threads", type=int)
@@ -35,6 +44,7 @@ if args.name != "":
   algorithm = args.name
 
 # Run ParMetis
+start = time.monotonic()
 parmetis_proc = subprocess.Popen(["mpirun -N " +str(args.threads) + " " +
                                 parmetis + " " +
                                 args.graph + " "
@@ -44,11 +54,11 @@ parmetis_proc = subprocess.Popen(["mpirun -N " +str(args.threads) + " " +
 def kill_proc():
 	os.killpg(os.getpgid(parmetis_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = parmetis_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(parmetis_proc.stdout, result_patterns, start=start)
+parmetis_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -56,24 +66,19 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 if parmetis_proc.returncode == 0:
-  # Extract metrics out of hMetis output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if ("Cut:" in s):
-      cut = int(s.split('Cut:')[1].split()[0])
-      km1 = cut
-    if ("Total:" in s):
-      total_time = float(s.split('Sum:')[1].split()[0].split(',')[0])
-    if ("Balance:" in s):
-      imbalance = float(s.split('Balance:')[1].split()[0]) - 1.0
+  cut = result.get("cut", cut)
+  km1 = cut
+  total_time = result.get("total_time", total_time)
+  imbalance = result.get("imbalance", imbalance)
 elif parmetis_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -87,4 +92,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      2147483647,
       sep=",")
\ No newline at end of file
@@ -7,9 +7,12 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 
+from instance_index import instance_total_weight
+from output_parser import Pattern, after, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -19,6 +22,15 @@ patoh = os.environ.get("PATOH")
 assert (patoh != None), "check env.sh"
 ###################################
 
+# Values extracted from the PaToH output (see output_parser.py)
+result_patterns = {
+  "km1": Pattern("'Con - 1' Cost", after("'Con - 1' Cost:"), int),
+  "cut": Pattern("Cut Cost", after("Cut Cost:"), int),
+  "max_part": Pattern("Part Weights", r"Max=\s*([^\s]*)", float),
+  "total_time": Pattern("Total   ", r"Total\s*:\s*([^\s]*)", float),
+  "io_time": Pattern("I/O", r"I/O\s*:\s*([^\s]*)", float),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("k", type=int)
@@ -40,30 +52,10 @@ elif args.objective == "km1":
   objective = "O"
 
 # Read hypergraph weight
-with open(str(args.graph)) as hypergraph:
-  header_parsed = False
-  is_weighted = False
-  total_weight = 0
-  for line in hypergraph:
-    if header_parsed or line.startswith('%'):
-      continue
-    else:
-      header_parsed = True
-      hg_params = line.split()
-      # patoh file format uses 0,1,2,3 for weight types
-      is_weighted = len(hg_params) >= 5 and hg_params[4] in ['1', '3']
-      if not is_weighted:
-        total_weight = int(hg_params[1])
-        break
-
-  if is_weighted:
-    # read weight from last line
-    last_line = line
-    for weight in line.split():
-      w = int(weight.strip())
-      total_weight += w
+total_weight = instance_total_weight(args.graph, "patoh")
 
 # Run PaToH-S
+start = time.monotonic()
 patoh_proc = subprocess.Popen([patoh,
                                args.graph,
                                str(args.k),
@@ -82,11 +74,11 @@ patoh_proc = subprocess.Popen([patoh,
 def kill_proc():
 	os.killpg(os.getpgid(patoh_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = patoh_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(patoh_proc.stdout, result_patterns, start=start)
+patoh_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -94,33 +86,22 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
+io_time = 2147483647
 
 if patoh_proc.returncode == 0:
-  # Extract metrics out of PaToH output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if ("Cells" in s):
-      t = re.compile('Cells : \s*([^\s]*)')
-      numHNs = int(str(t.findall(s)[0]))
-    if ("'Con - 1' Cost" in s):
-      km1 = int(s.split("'Con - 1' Cost:")[1])
-    if ("Cut Cost" in s):
-      cut = int(s.split("Cut Cost:")[1])
-    if ("Part Weights" in s):
-      t = re.compile('Min=\s*([^\s]*)')
-      min_part = float(t.findall(s)[0])
-      t = re.compile('Max=\s*([^\s]*)')
-      max_part = float(t.findall(s)[0])
-      imbalance = float(max_part) / math.ceil(float(total_weight) / args.k) - 1.0
-    if ("Total   " in s):
-      t = re.compile('Total\s*:\s*([^\s]*)')
-      total_time = float(t.findall(s)[0])
+  km1 = result.get("km1", km1)
+  cut = result.get("cut", cut)
+  if "max_part" in result:
+    imbalance = result["max_part"] / math.ceil(float(total_weight) / args.k) - 1.0
+  total_time = result.get("total_time", total_time)
+  io_time = result.get("io_time", io_time)
 elif patoh_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -134,4 +115,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      io_time,
       sep=",")
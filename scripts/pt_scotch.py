@@ -7,9 +7,11 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 
+from output_parser import Pattern, parse_output, token
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -18,6 +20,13 @@ scotch = os.environ.get("PTSCOTCH")
 assert (scotch != None), "check env.sh"
 ###################################
 
+# Values extracted from the PT-Scotch output (see output_parser.py)
+result_patterns = {
+  "cut": Pattern("CommCutSz", token(2), lambda value: int(value.split('(')[1].split(')')[0])),
+  "total_time": Pattern("Mapping", token(3), lambda value: float(value.split("=")[1])),
+  "imbalance": Pattern("Target", token(6), lambda value: float(value.split('=')[1]) - 1.0),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("graph", type=str)
 parser.add_argument("threads", type=int)
@@ -35,6 +44,7 @@ if args.name != "":
   algorithm = args.name
 
 
+start = time.monotonic()
 scotch_proc = subprocess.Popen(["mpirun -N " +str(args.threads) + " " +
                                 scotch + " " +
                                 str(args.k) + " " +
@@ -46,11 +56,11 @@ scotch_proc = subprocess.Popen(["mpirun -N " +str(args.threads) + " " +
 def kill_proc():
   os.killpg(os.getpgid(scotch_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = scotch_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(scotch_proc.stdout, result_patterns, start=start)
+scotch_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -59,24 +69,19 @@ soed = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 if scotch_proc.returncode == 0:
-  # Extract metrics out of hMetis output
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if ("CommCutSz" in s):
-      cut = int(s.split()[2].split('(')[1].split(')')[0])
-      km1 = cut
-    if ("Mapping" in s):
-      total_time = float(s.split()[3].split("=")[1])
-    if ("Target" in s):
-      imbalance = float(s.split()[6].split('=')[1]) - 1.0
+  cut = result.get("cut", cut)
+  km1 = cut
+  total_time = result.get("total_time", total_time)
+  imbalance = result.get("imbalance", imbalance)
 elif scotch_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       ntpath.basename(args.graph),
       timeout,
@@ -90,4 +95,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      2147483647,
       sep=",")
\ No newline at end of file
@@ -7,10 +7,11 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 import sys
 
+from timelimit import start_timer
+
 parser = argparse.ArgumentParser()
 parser.add_argument("partitioner", type=str)
 parser.add_argument("graph", type=str)
@@ -41,15 +42,15 @@ while timelimit > 0:
   def kill_proc():
     os.killpg(os.getpgid(partitioner_command.pid), signal.SIGTERM)
 
-  t = Timer(timelimit, kill_proc)
-  t.start()
+  t = start_timer(timelimit, kill_proc)
   out, err = partitioner_command.communicate()
   t.cancel()
   end = time.time()
 
   if partitioner_command.returncode == 0:
     # CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,
-    #             totalPartitionTime,objective,km1,cut,failed
+    #             totalPartitionTime,objective,km1,cut,failed,
+    #             wallTime,firstOutputTime,reportedPartitionTime,ioTime (of the single execution)
     values = out.split(',')
     partition_time = end - start # total partition time
     timelimit -= partition_time
@@ -88,6 +89,10 @@ if not found:
       2147483647,
       2147483647,
       "no",
+      2147483647,
+      2147483647,
+      2147483647,
+      2147483647,
       sep=",")
 
 
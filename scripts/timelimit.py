@@ -0,0 +1,24 @@
+#!/usr/bin/python3
+import os
+from threading import Timer
+
+# The time limit of a run is enforced by exactly one layer:
+#  - standalone (shell, slurm, --engine shell/pool): the wrapper script starts
+#    a Timer that sends SIGTERM to the process group of the partitioner
+#  - --engine async: the supervisor (experiments/supervisor.py) owns the time
+#    limit and sets SUPERVISED_TIMELIMIT=1 in the environment of the wrapper.
+#    It sends SIGTERM to the processes below the wrapper at the time limit, so
+#    the wrapper still reports timeout=yes, and the wrapper starts no thread.
+#
+# start_timer() returns the Timer in both cases, cancel() is always valid.
+
+
+def supervised():
+  return os.environ.get("SUPERVISED_TIMELIMIT") == "1"
+
+
+def start_timer(timelimit, kill_proc):
+  t = Timer(timelimit, kill_proc)
+  if not supervised():
+    t.start()
+  return t
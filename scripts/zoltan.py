@@ -7,9 +7,11 @@ import re
 import math
 import os
 import os.path
-from threading import Timer
 import signal
 
+from output_parser import Pattern, after, parse_output
+from timelimit import start_timer
+
 ###################################
 # SETUP ENV
 ###################################
@@ -19,6 +21,17 @@ experiment_dir = os.path.join(os.getcwd(), 'zoltan_driver_temps')
 assert (zoltan != None), "check env.sh"
 ###################################
 
+# Values extracted from the Zoltan output (see output_parser.py), the
+# statistics are printed before and after partitioning
+number = re.compile(r"[-+]?[.]?[\d]+(?:,\d\d\d)*[\.]?\d*(?:[eE][-+]?\d+)?")
+result_patterns = {
+  "cut": Pattern("CUTN", after(":"), lambda value: int(float(value)), skip=1),
+  "km1": Pattern("CUTL ", after(":"), lambda value: int(float(value)), skip=1),
+  "total_time": Pattern("Zoltan_LB_Partition", after("="), float),
+  "imbalance": Pattern("Zoltan_LB_Eval_HG  Number of objects : ", r"^(.*)$",
+                       lambda line: float(number.findall(line)[3]) - 1.0, skip=1),
+}
+
 parser = argparse.ArgumentParser()
 # make sure it's in Zoltan's format and ends on .zoltan.hg
 # same as PaToH's format but every node weight on its own line.
@@ -69,17 +82,18 @@ with open('zdrive.inp', 'w') as f:
 	print("File Name = ", graph_path_without_extension, file=f)
 
 # Run Zoltan
+start = time.monotonic()
 zoltan_proc = subprocess.Popen(["mpirun -N " + str(args.threads) + " " + zoltan],
                                stdout=subprocess.PIPE, universal_newlines=True, shell=True, preexec_fn=os.setsid)
 
 def kill_proc():
   os.killpg(os.getpgid(zoltan_proc.pid), signal.SIGTERM)
 
-t = Timer(args.timelimit, kill_proc)
-t.start()
-out, err = zoltan_proc.communicate()
+t = start_timer(args.timelimit, kill_proc)
+result = parse_output(zoltan_proc.stdout, result_patterns, start=start)
+zoltan_proc.wait()
 t.cancel()
-end = time.time()
+end = time.monotonic()
 
 total_time = 2147483647
 cut = 2147483647
@@ -87,38 +101,19 @@ km1 = 2147483647
 imbalance = 1.0
 timeout = "no"
 failed = "no"
+first_output_time = result.get("first_output_time", 2147483647)
 
 if zoltan_proc.returncode == 0:
-  i = 0
-  j = 0
-  k = 0
-  for line in out.split('\n'):
-    s = str(line).strip()
-    if "CUTN" in s:
-      if (i == 0):
-        i=1
-        continue
-      cut = int(float(s.split(':')[1]))
-    if "CUTL " in s:
-      if (j == 0):
-        j=1
-        continue
-      km1 = int(float(s.split(':')[1]))
-    if "Zoltan_LB_Partition" in s:
-      total_time = float(s.split('=')[1])
-    if ("Zoltan_LB_Eval_HG  Number of objects : " in s):
-        if (k == 0):
-          k=1
-          continue
-        res = re.findall("[-+]?[.]?[\d]+(?:,\d\d\d)*[\.]?\d*(?:[eE][-+]?\d+)?", s)
-        imbalance = float(res[3]) - 1.0
-
+  cut = result.get("cut", cut)
+  km1 = result.get("km1", km1)
+  total_time = result.get("total_time", total_time)
+  imbalance = result.get("imbalance", imbalance)
 elif zoltan_proc.returncode == -signal.SIGTERM:
   timeout = "yes"
 else:
   failed = "yes"
 
-# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed
+# CSV format: algorithm,graph,timeout,seed,k,epsilon,num_threads,imbalance,totalPartitionTime,objective,km1,cut,failed,wallTime,firstOutputTime,reportedPartitionTime,ioTime
 print(algorithm,
       graph_name,
       timeout,
@@ -132,4 +127,8 @@ print(algorithm,
       km1,
       cut,
       failed,
+      end - start,
+      first_output_time,
+      total_time,
+      2147483647,
       sep=",")
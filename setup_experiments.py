@@ -1,17 +1,28 @@
 #!/usr/bin/python3
 import json
 import argparse
+import contextlib
 import datetime
 import os
 import os.path
 import ntpath
+import random
 import shutil
+import sys
 import re
 
+from experiments.grid import expand_configs
+from experiments.memory import MemoryEstimator, instance_format
 from experiments.partitioner_mapping import partitioner_mapping
+from experiments.result_store import ResultStore
+from experiments.runtime import RuntimeEstimator
+from experiments.slurm import pack_bundles, parse_walltime, write_job_array
+from experiments.workload import iter_workload, parse_workload_line, read_workload, run_to_json
 
 partitioner_script_folder = os.environ.get("PARTITIONER_SCRIPT_FOLDER")
 assert (partitioner_script_folder != None), "check env.sh"
+sys.path.append(partitioner_script_folder)
+from instance_index import instance_metadata_list
 
 
 ###################################
@@ -22,17 +33,26 @@ def intersection(lst1, lst2):
   lst3 = [value for value in lst1 if value in lst2]
   return lst3
 
+# every instance folder is scanned only once, even if it is used by several partitioners
+_directory_entries = {}
+
+def list_directory(dir):
+  if dir not in _directory_entries:
+    with os.scandir(dir) as entries:
+      _directory_entries[dir] = [entry.name for entry in entries]
+  return _directory_entries[dir]
+
 def get_all_hypergraph_instances(dir):
-  return [dir + "/" + hg for hg in os.listdir(dir) if hg.endswith('.hgr') or hg.endswith('.hmetis')]
+  return [dir + "/" + hg for hg in list_directory(dir) if hg.endswith('.hgr') or hg.endswith('.hmetis')]
 
 def get_all_zoltan_instances(dir):
-  return [dir + "/" + zoltan_hg for zoltan_hg in os.listdir(dir) if zoltan_hg.endswith('.zoltan.hg')]
+  return [dir + "/" + zoltan_hg for zoltan_hg in list_directory(dir) if zoltan_hg.endswith('.zoltan.hg')]
 
 def get_all_graph_instances(dir):
-  return [dir + "/" + graph for graph in os.listdir(dir) if graph.endswith('.graph') or graph.endswith('.metis')]
+  return [dir + "/" + graph for graph in list_directory(dir) if graph.endswith('.graph') or graph.endswith('.metis')]
 
 def get_all_scotch_instances(dir):
-  return [dir + "/" + graph for graph in os.listdir(dir) if graph.endswith('.scotch')]
+  return [dir + "/" + graph for graph in list_directory(dir) if graph.endswith('.scotch')]
 
 def get_all_benchmark_instances_in_directory(input_format, instance_dir):
   if input_format == "hmetis" or input_format == "patoh":
@@ -72,6 +92,25 @@ def get_all_benchmark_instances(partitioner, config):
 
   assert False, f"No instances found for: {partitioner}"
 
+# "instance_filter": {"n": [1000, null], "weighted": false, ...} selects the instances whose
+# metadata (see scripts/instance_index.py) lies within the given bounds or has the given value
+def filter_instances(partitioner, instances, instance_filter):
+  metadata = instance_metadata_list([(instance, instance_format(partitioner, instance)) for instance in instances])
+  selected = {}
+  for (instance, tag), properties in zip(instances.items(), metadata):
+    matches = True
+    for key, condition in instance_filter.items():
+      assert key in properties, f"Unknown instance property: {key}"
+      value = properties[key]
+      if isinstance(condition, list):
+        lower, upper = condition
+        matches = matches and value is not None and (lower is None or value >= lower) and (upper is None or value <= upper)
+      else:
+        matches = matches and value == condition
+    if matches:
+      selected[instance] = tag
+  return selected
+
 def serial_partitioner_call(partitioner, instance, k, epsilon, seed, objective, timelimit):
   return (
     partitioner_script_folder + "/" + partitioner_mapping[partitioner].script + ".py " + instance
@@ -104,7 +143,70 @@ def partitioner_call(is_serial, partitioner, instance, threads, k, epsilon, seed
     call += f' | {{ line=$(cat); echo "{tag},$line"; }}'  # bash snippet which prepends to stdin
   return call
 
-def partitioner_dump(result_dir, instance, threads, k, seed):
+# Everything that is fixed for the runs of a partitioner config
+def partitioner_settings(partitioner_config, experiment_dir, dynamic_header):
+  partitioner = partitioner_config["partitioner"]
+  algorithm_file = partitioner
+  if "name" in partitioner_config:
+    algorithm_file = partitioner_config["name"]
+  algorithm_file = '_'.join(list(map(lambda x: x.lower(), re.split(' |-', algorithm_file))))
+  result_dir = experiment_dir + "/" + algorithm_file + "_results"
+  algorithm_name = '"' + partitioner + '"'
+  if "name" in partitioner_config:
+    algorithm_name = '"' + partitioner_config["name"] + '"'
+  header = None
+  if dynamic_header and partitioner_mapping[partitioner].dynamic_header:
+    header = partitioner_header(result_dir)
+  return {
+    "partitioner": partitioner,
+    "algorithm_file": algorithm_file,
+    "algorithm_name": algorithm_name,
+    "result_dir": result_dir,
+    "is_serial": not partitioner_mapping[partitioner].parallel,
+    "config_file": partitioner_config.get("config_file", ""),
+    "args": partitioner_config.get("args"),
+    "header": header,
+  }
+
+# Yields (config index, seed, instance, tag, k, epsilon, threads) of all runs in workload order,
+# without materializing the runs. With order "instance", all runs on an instance are
+# consecutive, so the instance stays in the page cache. The partitioners are shuffled
+# per instance, such that no partitioner systematically benefits from (or pays for)
+# a warm cache.
+def generate_runs(settings, config, epsilons, order, rng):
+  instances = [get_all_benchmark_instances(setting["partitioner"], config) for setting in settings]
+  # index all instances here, the wrapper scripts only read the index
+  for setting, config_instances in zip(settings, instances):
+    instance_metadata_list([(instance, instance_format(setting["partitioner"], instance)) for instance in config_instances])
+  if "instance_filter" in config:
+    instances = [filter_instances(setting["partitioner"], config_instances, config["instance_filter"])
+                 for setting, config_instances in zip(settings, instances)]
+
+  def runs_of(config_index, seed, instance, tag):
+    for k in config["k"]:
+      for epsilon in epsilons:
+        for threads in config["threads"]:
+          if settings[config_index]["is_serial"] and threads > 1 and len(config["threads"]) > 1:
+            continue
+          yield config_index, seed, instance, tag, k, epsilon, threads
+
+  if order == "instance":
+    for instance in dict.fromkeys(instance for config_instances in instances for instance in config_instances):
+      config_indices = [i for i in range(len(settings)) if instance in instances[i]]
+      rng.shuffle(config_indices)
+      for config_index in config_indices:
+        for seed in config["seeds"]:
+          yield from runs_of(config_index, seed, instance, instances[config_index][instance])
+  else:
+    for seed in config["seeds"]:
+      for config_index in range(len(settings)):
+        for instance, tag in instances[config_index].items():
+          yield from runs_of(config_index, seed, instance, tag)
+
+# The epsilon is part of the file name if the experiment has several
+def partitioner_dump(result_dir, instance, threads, k, seed, epsilon=None):
+  if epsilon is not None:
+    return os.path.abspath(result_dir) + "/" + ntpath.basename(instance) + "." + str(threads) + "." + str(k) + "." + str(epsilon) + "." + str(seed) + ".results"
   return os.path.abspath(result_dir) + "/" + ntpath.basename(instance) + "." + str(threads) + "." + str(k) + "." + str(seed) + ".results"
 
 def partitioner_header(result_dir):
@@ -119,91 +221,161 @@ def partitioner_header(result_dir):
 parser = argparse.ArgumentParser()
 parser.add_argument("experiment", type=str)
 parser.add_argument("-f", "--force", action="store_true")
+parser.add_argument("--extend", type=str, nargs="?", const="", default=None, metavar="DIR",
+                    help="add the runs of the experiment which are missing in an existing experiment folder (default: the "
+                         "folder of today) to its workload, e.g. after adding a seed or a k value; existing results are kept")
+parser.add_argument("--order", type=str, choices=["seed", "instance"], default="seed",
+                    help="order of the runs in workload.txt: seed by seed (default) or grouped by instance, so that each "
+                         "instance is read from disk only once (the partitioners are shuffled within each group)")
+parser.add_argument("--order-seed", type=int, default=0, help="seed for shuffling the partitioners with --order instance")
+parser.add_argument("--result-store", type=str, default=None,
+                    help="directory of results shared between experiments (see execute_experiments.py --result-store); "
+                         "runs which are already in the store are not executed again, their results are copied")
+parser.add_argument("--slurm-cores", type=int, default=None,
+                    help="additionally create a slurm job array whose tasks each run a bundle of runs on a node with this many cores")
+parser.add_argument("--slurm-time", type=str, default="24:00:00",
+                    help="walltime of each array task, runs are packed into bundles according to their estimated running time")
+parser.add_argument("--slurm-partition", type=str, default=None)
+parser.add_argument("--slurm-memory", type=str, default=None, help="memory per array task, e.g. 200G")
+parser.add_argument("--history", type=str, nargs="*", default=[],
+                    help="result csv files or folders of earlier experiments used to estimate running times")
 
 args = parser.parse_args()
+if args.force and args.extend is not None:
+  parser.error("--force and --extend are mutually exclusive")
 
 with open(args.experiment) as json_experiment:
   config = json.load(json_experiment)
 
 now = datetime.datetime.now()
 experiment_dir = str(now.year) + "-" + str(now.month) + "-" + str(now.day) + "_" + config["name"]
+if args.extend:
+  experiment_dir = args.extend.rstrip("/")
 workload_file = experiment_dir + "/workload.txt"
-if args.force:
-  shutil.rmtree(experiment_dir, ignore_errors=True)
-  os.makedirs(experiment_dir, exist_ok=True)
-else:
+json_workload_file = experiment_dir + "/workload.jsonl"
+# result file -> run, of the runs which are already in the workload
+existing_runs = {}
+if args.extend is not None:
+  if not os.path.exists(workload_file):
+    print(f"No workload in {experiment_dir} to extend")
+    exit(1)
+  for run in read_workload(workload_file):
+    existing_runs[run.result_file] = run
+elif not args.force:
   try:
     os.makedirs(experiment_dir, exist_ok=False)
   except OSError:
     print("Experiment directory already exists! Call with -f to delete old directory")
     exit(1)
 
-epsilon = config["epsilon"]
+# a list of epsilons is swept like k
+epsilons = config["epsilon"] if isinstance(config["epsilon"], list) else [config["epsilon"]]
 objective = config["objective"]
 timelimit = config["timelimit"]
 write_partition_file = config["write_partition_file"] if "write_partition_file" in config else False
 dynamic_header = config["dynamic_header"] if "dynamic_header" in config else True
+if config.get("scaling", False) and 1 not in config["threads"]:
+  # baseline of the speedups
+  config["threads"] = [1] + config["threads"]
+
+result_store = ResultStore(args.result_store) if args.result_store is not None else None
+num_restored = 0
+num_added = 0
+num_changed = 0
+# expected peak memory of each run (without history), for the resources in workload.jsonl
+memory_estimator = MemoryEstimator()
+
+if args.force:
+  # the old folder is only deleted if the config and the instances are valid
+  settings = [partitioner_settings(partitioner_config, experiment_dir, dynamic_header) for partitioner_config, _ in expand_configs(config["config"])]
+  for _ in generate_runs(settings, config, epsilons, args.order, random.Random(args.order_seed)):
+    pass
+  shutil.rmtree(experiment_dir, ignore_errors=True)
+  os.makedirs(experiment_dir, exist_ok=True)
 
 # Setup experiments
 try:
-  for partitioner_config in config["config"]:
-    partitioner = partitioner_config["partitioner"]
-    algorithm_file = partitioner
-    if "name" in partitioner_config:
-      algorithm_file = partitioner_config["name"]
-    algorithm_file = '_'.join(list(map(lambda x: x.lower(), re.split(' |-', algorithm_file))))
-    result_dir = experiment_dir + "/" + algorithm_file + "_results"
-    os.makedirs(result_dir, exist_ok=True)
-
-  for seed in config["seeds"]:
-    for partitioner_config in config["config"]:
-      partitioner = partitioner_config["partitioner"]
-      algorithm_file = partitioner
-      if "name" in partitioner_config:
-        algorithm_file = partitioner_config["name"]
-      algorithm_file = '_'.join(list(map(lambda x: x.lower(), re.split(' |-', algorithm_file))))
-      result_dir = experiment_dir + "/" + algorithm_file + "_results"
-
-      is_serial_partitioner = not partitioner_mapping[partitioner].parallel
-      config_file = ""
-      if "config_file" in partitioner_config:
-        config_file = partitioner_config["config_file"]
-      algorithm_name = '"' + partitioner + '"'
-      if "name" in partitioner_config:
-        algorithm_name = '"' + partitioner_config["name"] + '"'
-      args = None
-      if "args" in partitioner_config:
-        args = partitioner_config["args"]
+  settings = [partitioner_settings(partitioner_config, experiment_dir, dynamic_header) for partitioner_config, _ in expand_configs(config["config"])]
+  mode = "a" if args.extend is not None else "w"
+  with contextlib.ExitStack() as stack:
+    for setting in settings:
+      os.makedirs(setting["result_dir"], exist_ok=True)
+      setting["workload"] = stack.enter_context(open(experiment_dir + "/" + setting["algorithm_file"] + "_workload.txt", mode))
+    global_workload_file = stack.enter_context(open(workload_file, mode))
+    # folders set up before workload.jsonl existed are extended in workload.txt only
+    global_json_workload_file = None
+    if args.extend is None or os.path.exists(json_workload_file):
+      global_json_workload_file = stack.enter_context(open(json_workload_file, mode))
+
+    # the header is written by the first run of each partitioner config and seed
+    header_written = set()
+    # ... or by a run which is already in the workload
+    existing_result_dirs = {os.path.dirname(result_file) for result_file in existing_runs}
+    for config_index, seed, instance, tag, k, epsilon, threads in generate_runs(settings, config, epsilons, args.order, random.Random(args.order_seed)):
+      setting = settings[config_index]
+      partitioner = setting["partitioner"]
+      is_serial_partitioner = setting["is_serial"]
+      result_dir = setting["result_dir"]
+      result_file = partitioner_dump(result_dir, instance, threads, k, seed, epsilon if isinstance(config["epsilon"], list) else None)
+      if result_file in existing_runs:
+        existing_call = existing_runs[result_file].command.rpartition(" >> ")[0]
+        call = partitioner_call(is_serial_partitioner, partitioner, instance, threads, k, epsilon, seed, objective, timelimit, setting["config_file"], setting["algorithm_name"], setting["args"], None, tag)
+        # the header and its --tag flag are only passed to one run, see Run.with_seed
+        if re.sub(r" --header '[^']*'( --tag)?", "", existing_call).removesuffix(" --partition_folder=" + os.path.abspath(result_dir)) != call:
+          # e.g. another epsilon or time limit, the result file would mix both
+          num_changed += 1
+        continue
+      if result_store is not None and not write_partition_file:
+        # the header option is not part of the key, it is passed to the first run which is executed
+        run = parse_workload_line(partitioner_call(is_serial_partitioner, partitioner, instance, threads, k, epsilon, seed, objective, timelimit, setting["config_file"], setting["algorithm_name"], setting["args"], None, tag)
+                                  + " >> " + result_file)
+        entry = result_store.get(run)
+        if entry is not None:
+          result_store.restore(run, entry, partitioner_header(result_dir) if partitioner_mapping[partitioner].dynamic_header else None)
+          num_restored += 1
+          continue
       header = None
-      if dynamic_header and partitioner_mapping[partitioner].dynamic_header:
-        header = partitioner_header(result_dir)
-
-      partitioner_calls = []
-      for instance, tag in get_all_benchmark_instances(partitioner, config).items():
-        for k in config["k"]:
-          for threads in config["threads"]:
-            if is_serial_partitioner and threads > 1 and len(config["threads"]) > 1:
-              continue
-            call = partitioner_call(is_serial_partitioner, partitioner, instance, threads, k, epsilon, seed, objective, timelimit, config_file, algorithm_name, args, header, tag)
-            header = None
-            if write_partition_file:
-              call += " --partition_folder=" + os.path.abspath(result_dir)
-            call += " >> " + partitioner_dump(result_dir, instance, threads, k, seed)
-            partitioner_calls.append(call)
-
-      # Write partitioner calls to workload file
-      with open(experiment_dir + "/" + algorithm_file + "_workload.txt", "a") as partitioner_workload_file:
-        partitioner_workload_file.write("\n".join(partitioner_calls))
-        partitioner_workload_file.write("\n")
-
-      with open(workload_file, "a") as global_workload_file:
-        global_workload_file.write("\n".join(partitioner_calls))
-        global_workload_file.write("\n")
-
-except AssertionError as e:
-  shutil.rmtree(experiment_dir, ignore_errors=True)
-  raise e
-except FileNotFoundError as e:
-  shutil.rmtree(experiment_dir, ignore_errors=True)
+      if (setting["header"] is not None and (config_index, seed) not in header_written
+          and os.path.abspath(result_dir) not in existing_result_dirs):
+        header = setting["header"]
+        header_written.add((config_index, seed))
+      call = partitioner_call(is_serial_partitioner, partitioner, instance, threads, k, epsilon, seed, objective, timelimit, setting["config_file"], setting["algorithm_name"], setting["args"], header, tag)
+      if write_partition_file:
+        call += " --partition_folder=" + os.path.abspath(result_dir)
+      call += " >> " + result_file
+      # Write partitioner call to workload files
+      setting["workload"].write(call + "\n")
+      global_workload_file.write(call + "\n")
+      num_added += 1
+      if global_json_workload_file is not None:
+        run = parse_workload_line(call)
+        resources = {"cores": 1 if is_serial_partitioner else threads, "memory": memory_estimator.estimate(run)}
+        global_json_workload_file.write(run_to_json(run, resources) + "\n")
+
+except (AssertionError, FileNotFoundError) as e:
+  # an extended folder contains results
+  if args.extend is None:
+    shutil.rmtree(experiment_dir, ignore_errors=True)
   raise e
 
+if args.extend is not None:
+  print(f"{num_added} runs added to {experiment_dir}, {len(existing_runs)} runs were already in the workload")
+  if num_changed > 0:
+    print(f"Warning: {num_changed} runs in the workload differ from experiment.json (e.g. epsilon or time limit) "
+          "and were not changed, use a new experiment folder to repeat them")
+
+if result_store is not None:
+  print(f"{num_restored} runs restored from the result store")
+
+# Slurm job array
+if args.slurm_cores is not None and os.path.getsize(workload_file) > 0:
+  walltime = parse_walltime(args.slurm_time)
+  runtime_estimator = RuntimeEstimator(args.history)
+  # (id, cores, estimate) of each run, the workload is streamed again to write the bundles
+  items = [(run.id, min(run.threads, args.slurm_cores) if run.parallel else 1, runtime_estimator.estimate(run))
+           for run in iter_workload(workload_file)]
+  bundles = pack_bundles(items, args.slurm_cores, walltime)
+  job_script = write_job_array(experiment_dir, args.experiment, workload_file, bundles, args.slurm_cores, walltime,
+                               partition=args.slurm_partition, memory=args.slurm_memory, history=args.history)
+  print(f"Slurm job array with {len(bundles)} tasks: sbatch {job_script}")
+